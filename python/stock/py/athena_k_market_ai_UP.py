@@ -10,16 +10,17 @@
 """
 
 import os
+import re
 import sys
 import json
 import time
 import logging
 import argparse
 import traceback
-import socket 
+import socket
 from pathlib import Path
 from datetime import datetime, timedelta
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 import io
 import base64
 
@@ -65,6 +66,7 @@ if not check_internet_connection():
 try:
     import FinanceDataReader as fdr
     import pandas as pd
+    import pyarrow.parquet as pq # 파케이 메타데이터 선검사용 (pandas 파케이 엔진과 동일 패키지)
     import mplfinance as mpf
     import matplotlib.pyplot as plt
     import numpy as np
@@ -74,7 +76,7 @@ try:
     # 고급 분석용 라이브러리
     import ta # Technical Analysis Library
     from sklearn.preprocessing import StandardScaler
-    from sklearn.cluster import KMeans
+    from sklearn.cluster import KMeans, MiniBatchKMeans
     
     # DART 공시 필터링 (환경 변수 확인)
     DART_API_KEY = os.getenv("DART_API_KEY") 
@@ -102,6 +104,7 @@ except ModuleNotFoundError as e:
 BASE_DIR = Path(__file__).resolve().parents[2]
 LOG_DIR = BASE_DIR / "log"
 DATA_DIR = BASE_DIR / "data" / "stock_data"
+FEATURES_DIR = DATA_DIR / "features" # 종목별 특징 공학 결과 사이드카 캐시
 LISTING_FILE = BASE_DIR / "data" / "stock_list" / "stock_listing.json"
 LOG_FILE = LOG_DIR / "stock_analyzer_ultimate.log"
 
@@ -112,6 +115,7 @@ def setup_env():
     """환경 디렉토리를 설정하고 로깅을 초기화합니다."""
     LOG_DIR.mkdir(parents=True, exist_ok=True)
     DATA_DIR.mkdir(parents=True, exist_ok=True)
+    FEATURES_DIR.mkdir(parents=True, exist_ok=True)
     LISTING_FILE.parent.mkdir(parents=True, exist_ok=True)
     
     # 분석 속도를 위해 로깅 레벨을 WARNING으로 설정
@@ -199,25 +203,68 @@ def calculate_advanced_features(df: pd.DataFrame) -> pd.DataFrame:
     df = df.dropna()
     return df
 
-def add_market_regime_clustering(df: pd.DataFrame, n_clusters=4) -> pd.DataFrame:
+REGIME_FEATURE_COLS = ['RSI', 'MACD', 'BB_Width', 'TREND_CROSS']
+
+def fit_global_regime_model(items, n_clusters=4, sample_size=50):
+    """표본 종목들의 특징을 모아 시장 국면 K-Means 모델을 전체 실행에서 1회만 학습합니다.
+
+    종목별 KMeans.fit은 sklearn 초기화 비용이 지배적이므로, 균등 표본으로
+    학습한 (scaler, kmeans) 쌍을 반환하고 워커에서는 predict만 수행합니다.
+    """
+    sample = items[::max(1, len(items) // sample_size)][:sample_size]
+    feature_mats = []
+    for item in sample:
+        code = item.get("Code") or item.get("code")
+        path = DATA_DIR / f"{code}.parquet"
+        if not path.exists(): continue
+        try:
+            df = pd.read_parquet(path)
+            if df.empty or len(df) < 50: continue
+            df = calculate_advanced_features(df.iloc[-250:].copy(deep=False))
+            if len(df) < 50 or not all(col in df.columns for col in REGIME_FEATURE_COLS): continue
+            feature_mats.append(df[REGIME_FEATURE_COLS].to_numpy())
+        except Exception as e:
+            logging.debug(f"[{code}] 국면 학습 표본 수집 실패: {e}")
+
+    if not feature_mats:
+        logging.warning("국면 학습 표본을 수집하지 못해 종목별 클러스터링으로 대체합니다.")
+        return None
+
+    X = np.vstack(feature_mats)
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
+
+    # MiniBatchKMeans: 전 종목 특징을 쌓은 행렬에서 KMeans보다 수 배 빠름
+    kmeans = MiniBatchKMeans(n_clusters=n_clusters, random_state=42, n_init=10, batch_size=4096)
+    kmeans.fit(X_scaled)
+    return scaler, kmeans
+
+def add_market_regime_clustering(df: pd.DataFrame, n_clusters=4, regime_model=None) -> pd.DataFrame:
     """기술적 특징을 기반으로 K-Means 클러스터링을 수행하여 시장 국면을 정의합니다."""
-    feature_cols = ['RSI', 'MACD', 'BB_Width', 'TREND_CROSS']
-    min_data_length = 50 
-    
+    feature_cols = REGIME_FEATURE_COLS
+    min_data_length = 50
+
     if len(df) < min_data_length or not all(col in df.columns for col in feature_cols):
         logging.warning(f"클러스터링에 필요한 데이터 길이가 {min_data_length}일 미만입니다. ({len(df)}일)")
         df['MarketRegime'] = -1 # 데이터 부족 시 -1로 표시
         return df
 
     data = df[feature_cols].copy()
-    
+
+    # 전역 학습 모델이 있으면 predict만 수행 (종목별 fit 제거)
+    if regime_model is not None:
+        scaler, kmeans = regime_model
+        # 국면 레이블(-1~3)은 int8로 충분 — 특징 캐시 파일 크기도 함께 절감
+        df['MarketRegime'] = kmeans.predict(scaler.transform(data)).astype(np.int8)
+        return df
+
     scaler = StandardScaler()
     scaled_data = scaler.fit_transform(data)
-    
-    # K-Means 클러스터링 
+
+    # K-Means 클러스터링
     kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
-    df['MarketRegime'] = kmeans.fit_predict(scaled_data)
-    
+    df['MarketRegime'] = kmeans.fit_predict(scaled_data).astype(np.int8)
+
     return df
 
 
@@ -227,108 +274,114 @@ def add_market_regime_clustering(df: pd.DataFrame, n_clusters=4) -> pd.DataFrame
 
 def find_peaks_and_troughs(df, prominence=0.01, width=3):
     """주요 봉우리와 골짜기 인덱스 찾기 (최근 250일 기준)"""
-    recent_df = df.iloc[-250:].copy()
-    if recent_df.empty: return np.array([]), np.array([])
-    
+    closes = df['Close'].to_numpy()[-250:]
+    if closes.size == 0: return np.array([]), np.array([])
+
     # 가격 변동성(표준편차)을 기준으로 봉우리/골짜기 중요도 설정
-    std_dev = recent_df['Close'].std()
-    peaks, _ = find_peaks(recent_df['Close'], prominence=std_dev * prominence, width=width)
-    troughs, _ = find_peaks(-recent_df['Close'], prominence=std_dev * prominence, width=width)
-    
+    std_dev = closes.std()
+    peaks, _ = find_peaks(closes, prominence=std_dev * prominence, width=width)
+    troughs, _ = find_peaks(-closes, prominence=std_dev * prominence, width=width)
+
     # 전체 데이터프레임 인덱스로 변환
-    start_idx = len(df) - len(recent_df)
+    start_idx = len(df) - closes.size
     return peaks + start_idx, troughs + start_idx
 
 def find_double_bottom(df, troughs, tolerance=0.05, min_duration=30):
-    """이중 바닥 패턴 감지"""
-    # 최근 250일 내의 골짜기만 사용
-    recent_troughs = [t for t in troughs if t >= len(df) - 250]
-    if len(recent_troughs) < 2: return False, None, None, None
-    
-    idx2, idx1 = recent_troughs[-1], recent_troughs[-2] 
-    price1, price2 = df['Close'].iloc[idx1], df['Close'].iloc[idx2]
-    
+    """이중 바닥 패턴 감지 (numpy 배열 연산 기반)"""
+    closes = df['Close'].to_numpy()
+    # 최근 250일 내의 골짜기만 사용 (불리언 마스크로 일괄 필터링)
+    troughs = np.asarray(troughs, dtype=np.int64)
+    recent_troughs = troughs[troughs >= closes.size - 250]
+    if recent_troughs.size < 2: return False, None, None, None
+
+    idx2, idx1 = int(recent_troughs[-1]), int(recent_troughs[-2])
+    price1, price2 = closes[idx1], closes[idx2]
+
     if idx2 - idx1 < min_duration: return False, None, None, None # 최소 기간 충족
-    
+
     # 바닥 가격이 허용 오차 내인지 확인
     is_price_matching = abs(price1 - price2) / min(price1, price2) < tolerance
     if not is_price_matching: return False, None, None, None
-    
-    interim_high = df['Close'].iloc[idx1:idx2].max() # 중간 봉우리
-    current_price = df['Close'].iloc[-1]
+
+    interim_high = closes[idx1:idx2].max() # 중간 봉우리
+    current_price = closes[-1]
 
     is_breakout = current_price > interim_high # 넥 라인 돌파
-    
+
     if is_breakout: return True, interim_high, 'Breakout', interim_high
-    
+
     # 잠재적 패턴 확인 (바닥에서 50% 이상 회복)
     retrace_ratio = (current_price - min(price1, price2)) / (interim_high - min(price1, price2)) if interim_high > min(price1, price2) else 0
-    is_potential = retrace_ratio > 0.5 and current_price < interim_high 
-    
+    is_potential = retrace_ratio > 0.5 and current_price < interim_high
+
     if is_potential: return False, interim_high, 'Potential', interim_high
-        
+
     return False, None, None, None
 
 def find_triple_bottom(df, troughs, tolerance=0.05, min_duration_total=75):
-    """삼중 바닥 패턴 감지"""
-    recent_troughs = [t for t in troughs if t >= len(df) - 250]
-    if len(recent_troughs) < 3: return False, None, None, None
-    
-    idx3, idx2, idx1 = recent_troughs[-1], recent_troughs[-2], recent_troughs[-3]
-    price1, price2, price3 = df['Close'].iloc[idx1], df['Close'].iloc[idx2], df['Close'].iloc[idx3]
-    
+    """삼중 바닥 패턴 감지 (numpy 배열 연산 기반)"""
+    closes = df['Close'].to_numpy()
+    troughs = np.asarray(troughs, dtype=np.int64)
+    recent_troughs = troughs[troughs >= closes.size - 250]
+    if recent_troughs.size < 3: return False, None, None, None
+
+    idx3, idx2, idx1 = int(recent_troughs[-1]), int(recent_troughs[-2]), int(recent_troughs[-3])
+    price1, price2, price3 = closes[idx1], closes[idx2], closes[idx3]
+
     if idx3 - idx1 < min_duration_total: return False, None, None, None # 최소 기간 충족
-    
+
     # 세 바닥 가격이 허용 오차 내인지 확인
     min_price = min(price1, price2, price3)
     max_price = max(price1, price2, price3)
     is_price_matching = (max_price - min_price) / min_price < tolerance
     if not is_price_matching: return False, None, None, None
-    
-    high1 = df['Close'].iloc[idx1:idx2].max()
-    high2 = df['Close'].iloc[idx2:idx3].max()
+
+    high1 = closes[idx1:idx2].max()
+    high2 = closes[idx2:idx3].max()
     neckline = max(high1, high2) # 넥 라인 = 중간 봉우리 중 가장 높은 값
-    current_price = df['Close'].iloc[-1]
+    current_price = closes[-1]
 
     is_breakout = current_price > neckline # 넥 라인 돌파
-    
+
     if is_breakout: return True, neckline, 'Breakout', neckline
-    
+
     # 잠재적 패턴 확인
     retrace_ratio = (current_price - min_price) / (neckline - min_price) if neckline > min_price else 0
     is_potential = retrace_ratio > 0.5 and current_price < neckline
-    
+
     if is_potential: return False, neckline, 'Potential', neckline
-        
+
     return False, None, None, None
 
 
 def find_cup_and_handle(df, peaks, troughs, handle_drop_ratio=0.3):
-    """컵 앤 핸들 패턴 감지"""
-    recent_peaks = [p for p in peaks if p >= len(df) - 250]
-    if len(recent_peaks) < 2: return False, None, None, None
-    
-    peak_right_idx = recent_peaks[-1]
-    peak_right_price = df['Close'].iloc[peak_right_idx]
-    
+    """컵 앤 핸들 패턴 감지 (numpy 배열 연산 기반)"""
+    closes = df['Close'].to_numpy()
+    peaks = np.asarray(peaks, dtype=np.int64)
+    recent_peaks = peaks[peaks >= closes.size - 250]
+    if recent_peaks.size < 2: return False, None, None, None
+
+    peak_right_idx = int(recent_peaks[-1])
+    peak_right_price = closes[peak_right_idx]
+
     # 컵 모양 형성 확인 로직 (간단화)
     # 컵의 오른쪽 봉우리가 가장 최근 봉우리여야 함
-    
-    handle_start_idx = peak_right_idx 
+
+    handle_start_idx = peak_right_idx
     handle_max_drop = peak_right_price * (1 - handle_drop_ratio) # 핸들 최대 하락 깊이
 
-    current_price = df['Close'].iloc[-1]
-    
+    current_price = closes[-1]
+
     # 핸들 형성 조건: 오른쪽 봉우리 이후 가격이 그 봉우리를 넘지 않고, 최대 하락 폭(30%) 이내에 있어야 함
-    is_handle_forming = (df['Close'].iloc[handle_start_idx:].max() <= peak_right_price) 
+    is_handle_forming = (closes[handle_start_idx:].max() <= peak_right_price)
     is_handle_forming &= (current_price > handle_max_drop)
 
     if is_handle_forming and current_price > peak_right_price:
         return True, peak_right_price, 'Breakout', peak_right_price
-    
+
     if is_handle_forming and current_price <= peak_right_price:
         return False, peak_right_price, 'Potential', peak_right_price
-        
+
     return False, None, None, None
 
 # ==============================
@@ -394,29 +447,61 @@ def get_fundamental_data(code):
     headlines = get_yfinance_news(code)
     return fundamentals, headlines
 
-def check_for_negative_dart_disclosures(corp_code):
+# 프로세스당 1회 생성되는 DART 클라이언트 (호출마다 재생성 방지, 연결 재사용)
+_DART_CLIENT = None
+
+def _ensure_dart_client():
+    """DART 클라이언트를 1회만 생성하여 내부 세션(연결)을 재사용합니다."""
+    global _DART_CLIENT
+    if DART_AVAILABLE and _DART_CLIENT is None:
+        try:
+            _DART_CLIENT = Dart(DART_API_KEY)
+        except Exception as e:
+            logging.warning(f"DART 클라이언트 초기화 실패: {e}")
+
+# 악재성 키워드 목록 (보고서명 검사를 위해 정규식으로 사전 컴파일)
+_NEGATIVE_REPORT_RE = re.compile("횡령|배임|소송 제기|손해배상|거래정지|상장폐지|감사의견 거절|파산|회생")
+
+def _is_negative_report(report_nm):
+    """보고서명이 악재성 키워드에 해당하는지 검사합니다."""
+    # 유상증자 중 제3자배정은 긍정적일 수 있으므로 악재 필터에서 제외
+    if "유상증자 결정" in report_nm and "제3자배정" in report_nm: return False
+    return _NEGATIVE_REPORT_RE.search(report_nm) is not None
+
+def check_for_negative_dart_disclosures(corp_code, start_dt=None):
     """DART 공시에서 악재성 키워드 검사 (환경 변수 사용)"""
     if not DART_AVAILABLE or not corp_code or not DART_API_KEY: return False, None
     try:
-        dart = Dart(DART_API_KEY)
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=60) # 최근 60일 공시
-        reports = dart.search(corp_code=corp_code, start_dt=start_date.strftime('%Y%m%d'))
-        
-        # 악재성 키워드 목록
-        negative_keywords = ["횡령", "배임", "소송 제기", "손해배상", "거래정지", "상장폐지", "감사의견 거절", "파산", "회생"]
-        for report in reports:
-            # 유상증자 중 제3자배정은 긍정적일 수 있으므로 악재 필터에서 제외
-            if "유상증자 결정" in report.report_nm and "제3자배정" in report.report_nm: continue 
-            if any(keyword in report.report_nm for keyword in negative_keywords):
-                return True, f"DART 공시 악재: '{report.report_nm}'"
+        _ensure_dart_client()
+        dart = _DART_CLIENT if _DART_CLIENT is not None else Dart(DART_API_KEY)
+        if start_dt is None:
+            start_dt = (datetime.now() - timedelta(days=60)).strftime('%Y%m%d') # 최근 60일 공시
+        reports = dart.search(corp_code=corp_code, start_dt=start_dt)
+
+        # 첫 악재 발견 시 즉시 중단 (제너레이터 기반 단락 평가)
+        hit = next((report.report_nm for report in reports if _is_negative_report(report.report_nm)), None)
+        if hit: return True, f"DART 공시 악재: '{hit}'"
         return False, None
     except Exception as e:
         logging.error(f"DART 공시 확인 중 오류 ({corp_code}): {e}")
         return False, None
 
-def check_for_negatives(fundamentals, headlines, code, corp_code):
-    """뉴스/재무/공시 기반으로 악재성 종목 여부를 검사"""
+def check_dart_disclosures_batch(corp_codes, max_workers=8):
+    """여러 종목의 DART 공시 악재를 일괄 동시 조회합니다. {corp_code: (악재 여부, 사유)}를 반환합니다.
+
+    네트워크 대기 시간이 지배적인 작업이므로, 공유 클라이언트 1개 위에서
+    스레드 풀로 I/O만 중첩하여 호출당 연결/클라이언트 생성 비용을 제거합니다."""
+    if not DART_AVAILABLE or not corp_codes:
+        return {}
+    _ensure_dart_client()
+    # 조회 구간은 실행 중 변하지 않으므로 날짜 문자열을 1회만 계산해 전 호출이 공유
+    start_dt = (datetime.now() - timedelta(days=60)).strftime('%Y%m%d')
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(corp_codes))) as pool:
+        verdicts = pool.map(lambda c: check_for_negative_dart_disclosures(c, start_dt), corp_codes)
+        return dict(zip(corp_codes, verdicts))
+
+def check_for_negatives(fundamentals, headlines, code):
+    """뉴스/재무 기반으로 악재성 종목 여부를 검사 (DART 공시는 분석 후 일괄 조회)"""
     negative_keywords_news = ["횡령", "배임", "소송", "분쟁", "거래 정지", "악재", "하락 전망", "투자주의", "적자"]
     
     # 1. 뉴스 악재 확인
@@ -432,41 +517,41 @@ def check_for_negatives(fundamentals, headlines, code, corp_code):
     if pe_ratio is not None and not pd.isna(pe_ratio) and pe_ratio < 0: 
         return True, f"재무 악재: P/E {pe_ratio:.1f} (적자)"
     
-    # P/B 비율이 1.0 미만 (장부가치보다 낮음)이더라도 다른 필터로 잡을 수 있으므로, 
+    # P/B 비율이 1.0 미만 (장부가치보다 낮음)이더라도 다른 필터로 잡을 수 있으므로,
     # 여기서는 극도로 낮은 밸류에이션만 확인 (예: 0.3 미만 등) - 단독 악재로 보기 어려워 일단 P/E만 사용
 
-    # 3. DART 공시 악재 확인
-    is_negative_dart, reason_dart = check_for_negative_dart_disclosures(corp_code)
-    if is_negative_dart: return True, reason_dart
-        
+    # DART 공시 악재는 필터 통과 종목에 한해 run_analysis에서 일괄 확인
     return False, None
 
 # ==============================
 # 7. 분석 실행 및 필터링
 # ==============================
 
-def check_ma_conditions(df, periods, analyze_patterns):
+MA_COLS = {20: 'SMA_20', 50: 'SMA_50', 200: 'SMA_200'}
+
+def build_periods_spec(periods):
+    """기간 리스트를 (기간, 사전 계산 컬럼명) 튜플로 변환합니다 (종목별 dict 조회 제거)."""
+    return tuple((p, MA_COLS.get(p)) for p in periods)
+
+def check_ma_conditions(df, periods_spec, analyze_patterns):
     """이동 평균선 및 패턴 분석을 수행하고 결과를 반환합니다."""
     results = {}
-    
-    ma_cols = {20: 'SMA_20', 50: 'SMA_50', 200: 'SMA_200'}
 
     # 200일 미만 데이터는 패턴 분석에 부적합하다고 판단
     if len(df) < 200: analyze_patterns = False
-        
-    # 현재가 vs 이동 평균선 비교
-    for p in periods:
-        col_name = ma_cols.get(p)
+
+    # 현재가 vs 이동 평균선 비교 (기간-컬럼 매핑은 run_analysis에서 1회 결정됨)
+    for p, col_name in periods_spec:
         if col_name and col_name in df.columns:
             results[f"above_ma{p}"] = df['Close'].iloc[-1] > df[col_name].iloc[-1]
         elif len(df) >= p:
              # 임시로 MA 계산 (analyze_symbol에서 이미 계산되었을 가능성 높음)
-             df[f'ma{p}'] = df['Close'].rolling(window=p, min_periods=1).mean() 
+             df[f'ma{p}'] = df['Close'].rolling(window=p, min_periods=1).mean()
              results[f"above_ma{p}"] = df['Close'].iloc[-1] > df[f'ma{p}'].iloc[-1]
-    
+
     # 골든/데드 크로스 로직 (SMA_50 vs SMA_200)
-    ma50_col = ma_cols.get(50)
-    ma200_col = ma_cols.get(200)
+    ma50_col = MA_COLS.get(50)
+    ma200_col = MA_COLS.get(200)
 
     if ma50_col in df.columns and ma200_col in df.columns and len(df) >= 200:
         # 전날과 오늘 이동평균선 위치 비교
@@ -503,8 +588,26 @@ def check_ma_conditions(df, periods, analyze_patterns):
 
     return results
 
-def analyze_symbol(item, periods, analyze_patterns, exclude_negatives, pattern_type_filter):
+def _compile_filter(pattern_type_filter):
+    """필터 문자열을 (종류, 인자) 튜플로 1회 파싱합니다 (종목별 재파싱 방지)."""
+    if not pattern_type_filter:
+        return None, None
+    if pattern_type_filter == 'goldencross':
+        return 'goldencross', None
+    if pattern_type_filter in ['double_bottom', 'triple_bottom', 'cup_and_handle']:
+        return 'pattern', f'pattern_{pattern_type_filter}_status'
+    if pattern_type_filter.startswith('regime:'):
+        try:
+            return 'regime', int(pattern_type_filter.split(':')[1])
+        except ValueError:
+            return 'invalid', None
+    if pattern_type_filter == 'ma':
+        return 'ma', None
+    return 'invalid', None # 알 수 없는 필터 유형
+
+def analyze_symbol(item, periods_spec, analyze_patterns, exclude_negatives, pattern_filter, regime_model=None):
     """단일 종목을 분석하고 결과를 반환합니다."""
+    filter_kind, filter_arg = pattern_filter
     code = item.get("Code") or item.get("code")
     name = item.get("Name") or item.get("name")
     corp_code = item.get("DartCorpCode")
@@ -516,74 +619,100 @@ def analyze_symbol(item, periods, analyze_patterns, exclude_negatives, pattern_t
         return None
     
     try:
-        df_raw = pd.read_parquet(path)
-        if df_raw.empty or len(df_raw) < 50: 
-            logging.debug(f"[{code}] 데이터 부족 ({len(df_raw)}일).")
+        # 메타데이터만 읽어 데이터 길이를 선검사 (~KB I/O) — 짧은 종목은 본문 로드 없이 즉시 제외
+        num_rows = pq.ParquetFile(path).metadata.num_rows
+        if num_rows < 50:
+            logging.debug(f"[{code}] 데이터 부족 ({num_rows}일, 메타데이터 선검사).")
             return None
-        
-        # 2. 분석에 사용할 최근 250일 데이터 슬라이스
-        df = df_raw.iloc[-250:].copy()
 
-        # 3. 기술적 특징 공학 및 클러스터링
-        df = calculate_advanced_features(df)
+        df_raw = pd.read_parquet(path)
+
+        # MA/패턴/클러스터링 연산에는 float32 정밀도로 충분
+        # (메모리 대역폭 절반, numpy SIMD 처리량 2배)
+        for col in ("Open", "High", "Low", "Close"):
+            if col in df_raw.columns:
+                df_raw[col] = df_raw[col].astype(np.float32, copy=False)
+
+        # 2. 특징 사이드카 캐시 확인: 마지막 거래일이 같으면 어제 계산한 결과를 재사용
+        last_date = df_raw.index[-1]
+        features_path = FEATURES_DIR / f"{code}.parquet"
+        df = None
+        if features_path.exists():
+            try:
+                cached = pd.read_parquet(features_path)
+                if not cached.empty and cached.index[-1] == last_date:
+                    df = cached
+            except Exception as e:
+                logging.debug(f"[{code}] 특징 캐시 로드 실패 -> 재계산: {e}")
+
+        if df is None:
+            # 3. 분석에 사용할 최근 250일 데이터 슬라이스 후 특징 공학 및 클러스터링
+            # deep=False: 특징 공학은 새 컬럼만 추가하므로 데이터 블록 복사가 불필요함
+            # (calculate_advanced_features 말미의 dropna()가 새 프레임을 만들며 원본 참조도 해제됨)
+            df = df_raw.iloc[-250:].copy(deep=False)
+            df = calculate_advanced_features(df)
+            if len(df) < 50: return None
+
+            df = add_market_regime_clustering(df, regime_model=regime_model)
+
+            # 임시 파일에 쓴 뒤 교체하여 원자적으로 저장 (병렬 실행 중 부분 파일 노출 방지)
+            try:
+                tmp_path = features_path.with_name(f"{code}.parquet.tmp")
+                df.to_parquet(tmp_path)
+                os.replace(tmp_path, features_path)
+            except Exception as e:
+                logging.debug(f"[{code}] 특징 캐시 저장 실패: {e}")
+
+        del df_raw # 원본 전체 기간 데이터는 즉시 해제하여 워커당 메모리 피크 절감
         if len(df) < 50: return None
-        
-        df = add_market_regime_clustering(df)
-        
+
         # 4. 기본적 분석 및 뉴스 수집
         fundamentals, headlines = get_fundamental_data(code)
         
         # 5. 악재 필터링
         if exclude_negatives:
-            is_negative, reason = check_for_negatives(fundamentals, headlines, code, corp_code)
+            is_negative, reason = check_for_negatives(fundamentals, headlines, code)
             if is_negative:
                 logging.info(f"[{code}] {name}: 악재성 요인으로 제외됨 - {reason}")
                 return None
             
         # 6. 기술적 조건 및 패턴 분석
-        analysis_results = check_ma_conditions(df, periods, analyze_patterns) 
+        analysis_results = check_ma_conditions(df, periods_spec, analyze_patterns)
         
-        # 7. 필터 유형에 따른 최종 매칭 검사
+        # 7. 필터 유형에 따른 최종 매칭 검사 (파싱은 _compile_filter에서 1회 수행됨)
         is_match = True
-        if pattern_type_filter:
-            if pattern_type_filter == 'goldencross': 
-                is_match = analysis_results.get("goldencross_50_200_detected", False)
-            elif pattern_type_filter in ['double_bottom', 'triple_bottom', 'cup_and_handle']: 
-                status_key = f'pattern_{pattern_type_filter}_status'
-                status = analysis_results.get(status_key)
-                # 돌파 또는 잠재적 패턴 모두 매칭으로 간주
-                is_match = status in ['Breakout', 'Potential'] 
-            elif pattern_type_filter.startswith('regime:'):
-                if 'market_regime' in analysis_results:
-                    try:
-                        target_regime = int(pattern_type_filter.split(':')[1])
-                        current_regime = analysis_results['market_regime']
-                        is_match = (current_regime == target_regime)
-                    except ValueError:
-                        is_match = False
-                else:
-                    is_match = False
-            elif pattern_type_filter == 'ma':
-                 # MA 필터가 명시적으로 요청되었을 경우, 모든 MA 조건이 충족되어야 함
-                 is_match = all(analysis_results.get(f"above_ma{p}", False) for p in periods)
-            else: 
-                is_match = False # 알 수 없는 필터 유형
-        
+        if filter_kind == 'goldencross':
+            is_match = analysis_results.get("goldencross_50_200_detected", False)
+        elif filter_kind == 'pattern':
+            status = analysis_results.get(filter_arg)
+            # 돌파 또는 잠재적 패턴 모두 매칭으로 간주
+            is_match = status in ['Breakout', 'Potential']
+        elif filter_kind == 'regime':
+            is_match = analysis_results.get('market_regime') == filter_arg
+        elif filter_kind == 'ma':
+            # MA 필터가 명시적으로 요청되었을 경우, 모든 MA 조건이 충족되어야 함
+            is_match = all(analysis_results.get(f"above_ma{p}", False) for p, _ in periods_spec)
+        elif filter_kind == 'invalid':
+            is_match = False
+
         # 필터링 조건에 맞지 않으면 제외
-        if pattern_type_filter and not is_match: return None
+        if filter_kind and not is_match: return None
         
         # 8. 결과 정리 및 반환
         if analysis_results or fundamentals or headlines:
             # None 또는 NaN 값 정리 (JSON 직렬화 오류 방지)
-            fundamentals_clean = {k: v for k, v in fundamentals.items() if v is not None and not (isinstance(v, (float, np.float64)) and np.isnan(v))}
-            analysis_clean = {k: v for k, v in analysis_results.items() if v is not None and not (isinstance(v, (float, np.float64)) and np.isnan(v))}
+            # pd.Series.dropna()는 None/NaN을 C 레벨에서 일괄 제거 (키별 파이썬 루프 제거)
+            fundamentals_clean = pd.Series(fundamentals, dtype=object).dropna().to_dict()
+            analysis_clean = pd.Series(analysis_results, dtype=object).dropna().to_dict()
             
             return {
                 "ticker": code,
                 "name": name,
                 "technical_conditions": analysis_clean,
                 "fundamentals": fundamentals_clean,
-                "recent_news_headlines": headlines
+                "recent_news_headlines": headlines,
+                # DART 일괄 조회용 내부 키 (최종 출력 전 제거됨)
+                "dart_corp_code": corp_code
             }
         return None
     except Exception as e:
@@ -601,20 +730,29 @@ def run_analysis(workers, ma_periods_str, analyze_patterns, exclude_negatives, p
         analyze_patterns = True 
     
     # MA 크로스 체크 및 패턴 분석을 위해 50일, 200일은 강제로 포함
-    if 50 not in periods: periods.append(50) 
+    if 50 not in periods: periods.append(50)
     if 200 not in periods: periods.append(200)
 
+    # 기간-컬럼 매핑을 1회만 구성하여 전 워커가 공유
+    periods_spec = build_periods_spec(periods)
+
     items = load_listing()
     initial_item_count = len(items)
     results = []
-    
+
     logging.warning(f"분석 시작: 총 {initial_item_count} 종목, 최대 워커 {workers}개 사용. 필터: {pattern_type_filter or 'None'}")
 
     processed_count = 0
-    
-    with ThreadPoolExecutor(max_workers=workers) as executor:
+    # 필터 문자열은 전체 실행에서 동일하므로 여기서 1회만 파싱
+    pattern_filter = _compile_filter(pattern_type_filter)
+    # 시장 국면 모델도 표본 기반으로 1회만 학습하여 전 워커가 공유
+    regime_model = fit_global_regime_model(items)
+
+    # CPU 바운드 특징 공학/클러스터링이 지배적이므로 프로세스 풀 사용 (GIL 회피)
+    # DART 공시 조회는 워커가 아닌 부모에서 일괄 수행되므로 워커 초기화가 필요 없음
+    with ProcessPoolExecutor(max_workers=workers) as executor:
         future_to_item = {
-            executor.submit(analyze_symbol, item, periods, analyze_patterns, exclude_negatives, pattern_type_filter): item
+            executor.submit(analyze_symbol, item, periods_spec, analyze_patterns, exclude_negatives, pattern_filter, regime_model): item
             for item in items
         }
         
@@ -638,7 +776,25 @@ def run_analysis(workers, ma_periods_str, analyze_patterns, exclude_negatives, p
                 code = future_to_item[future].get("Code") or future_to_item[future].get("code")
                 name = future_to_item[future].get("Name") or future_to_item[future].get("name")
                 logging.error(f"[ERROR] {code} {name} 처리 중 예외 발생: {e}")
-    
+
+    # DART 공시 확인은 필터를 통과한 소수 종목에 대해서만 일괄 수행
+    # (전 종목 워커 내 동기 호출 대비 호출 수와 총 대기 시간이 모두 감소)
+    if exclude_negatives and DART_AVAILABLE:
+        corp_codes = [r["dart_corp_code"] for r in results if r.get("dart_corp_code")]
+        verdicts = check_dart_disclosures_batch(corp_codes)
+        kept = []
+        for r in results:
+            is_negative, reason = verdicts.get(r.get("dart_corp_code"), (False, None))
+            if is_negative:
+                logging.info(f"[{r['ticker']}] {r['name']}: 악재성 요인으로 제외됨 - {reason}")
+            else:
+                kept.append(r)
+        results = kept
+
+    # 내부 전용 키는 최종 출력에서 제거
+    for r in results:
+        r.pop("dart_corp_code", None)
+
     end_time = time.time()
     
     data_check = {
@@ -669,11 +825,13 @@ def generate_chart(symbol, ma_periods_str):
         return
     
     try:
-        df = pd.read_parquet(path)
-        if df.empty:
+        # 메타데이터 선검사로 빈 파일을 본문 로드 없이 걸러냄
+        if pq.ParquetFile(path).metadata.num_rows == 0:
             safe_print_json({"error": "데이터프레임이 비어 있습니다."}, status_code=1)
             return
-            
+
+        df = pd.read_parquet(path)
+
         # 최근 250일 데이터만 사용하여 차트 생성
         df_for_chart = df.iloc[-250:].copy() 
         df_for_chart = calculate_advanced_features(df_for_chart)
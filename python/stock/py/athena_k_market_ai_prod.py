@@ -7,36 +7,84 @@
     - 수정: --symbol 인자를 통한 단일 종목 분석 기능 추가
 """
 
+import gc
 import os
 import sys
 import json
 import time
 import logging
 import argparse
+import pickle
 import traceback
 import socket
 from pathlib import Path
 from datetime import datetime, timedelta
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing as mp
 import glob
+from dataclasses import dataclass, asdict
+from typing import Optional
 
 import pandas as pd
 import numpy as np
+
+# 슬라이스/대입의 중간 복사를 지연 — 모듈 수준에서 켜야 spawn 워커에도 적용된다
+pd.options.mode.copy_on_write = True
 from scipy.signal import find_peaks
 import ta
+from pyarrow.lib import ArrowInvalid
 from sklearn.preprocessing import StandardScaler
-from sklearn.cluster import KMeans
+from sklearn.cluster import MiniBatchKMeans
+
+# 고속 JSON 직렬화용 (미설치 시 CustomJsonEncoder 경로 사용)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ModuleNotFoundError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+# 수치 커널 JIT 컴파일용 (미설치 시 동일 코드를 순수 numpy로 실행)
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ModuleNotFoundError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """numba 미설치 시 원본 함수를 그대로 반환하는 무동작 데코레이터."""
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
 
 
 # ==============================
 # 1. 초기 안전 검사 및 필수 라이브러리 임포트
 # ==============================
 
+def _orjson_default(obj):
+    """orjson이 네이티브로 처리하지 못하는 타입만 변환 (set, 날짜 포맷)."""
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, (pd.Timestamp, datetime, np.datetime64)):
+        return pd.Timestamp(obj).strftime('%Y-%m-%d')
+    raise TypeError
+
+
 def safe_print_json(data, status_code=1):
     """표준 출력(stdout)으로 JSON을 안전하게 출력하고 프로세스를 종료합니다."""
     try:
-        # CustomJsonEncoder를 사용하여 np 타입 및 datetime 객체 처리
-        sys.stdout.write(json.dumps(data, ensure_ascii=False, indent=None, separators=(',', ':'), cls=CustomJsonEncoder) + "\n")
+        if ORJSON_AVAILABLE:
+            # numpy 스칼라/배열은 C 레벨에서 직렬화 (OHLCV 수만 포인트에서
+            # 타입별 .default() 파이썬 호출 루프가 사라짐), NaN은 null로 출력됨
+            sys.stdout.buffer.write(orjson.dumps(
+                data, default=_orjson_default,
+                option=(orjson.OPT_SERIALIZE_NUMPY
+                        | orjson.OPT_NON_STR_KEYS
+                        | orjson.OPT_PASSTHROUGH_DATETIME)) + b"\n")
+        else:
+            # CustomJsonEncoder를 사용하여 np 타입 및 datetime 객체 처리
+            sys.stdout.write(json.dumps(data, ensure_ascii=False, indent=None, separators=(',', ':'), cls=CustomJsonEncoder) + "\n")
     except Exception as e:
         sys.stdout.write(json.dumps({"error": "JSON_SERIALIZATION_FAIL", "original_error": str(e)}, ensure_ascii=False) + "\n")
         
@@ -55,10 +103,6 @@ def check_internet_connection(host="8.8.8.8", port=53, timeout=3):
     except Exception:
         return False
 
-# 스크립트 시작 시 인터넷 연결 확인
-if not check_internet_connection():
-    safe_print_json({"error": "CRITICAL_ERROR", "reason": "인터넷 연결을 확인할 수 없습니다.", "mode": "initial_check"})
-
 # ==============================
 # 1.5. JSON Custom Encoder 정의
 # ==============================
@@ -91,6 +135,9 @@ LISTING_FILE = BASE_DIR / "data" / "stock_list" / "stock_listing.json"
 CACHE_DIR = BASE_DIR / "cache" 
 LOG_FILE = LOG_DIR / "stock_analyzer_ultimate.log"
 
+# 실행 당일 문자열 — 단발 실행 스크립트이므로 한 번만 포맷해 전역에서 재사용
+TODAY_STR = datetime.now().strftime("%Y%m%d")
+
 
 # ==============================
 # 3. 환경 초기화 및 유틸리티
@@ -142,8 +189,9 @@ def cleanup_old_cache(days=7):
     
     cutoff_time = datetime.now() - timedelta(days=days)
     
-    cache_files = CACHE_DIR.glob('*.json')
-    
+    # 결과 캐시(JSON)와 일자별 국면 모델(regime_model_{날짜}.pkl)을 같은 기준으로 정리
+    cache_files = list(CACHE_DIR.glob('*.json')) + list(CACHE_DIR.glob('regime_model_*.pkl'))
+
     deleted_count = 0
     for file_path in cache_files:
         try:
@@ -156,6 +204,25 @@ def cleanup_old_cache(days=7):
         except Exception as e:
             logging.error(f"캐시 파일 {file_path.name} 정리 중 오류 발생: {e}")
 
+    # 특징 캐시(feat_<code>_<mtime>.parquet)는 종목별로 최신 mtime 키 하나만 유지
+    latest_feat = {}
+    for file_path in CACHE_DIR.glob('feat_*.parquet'):
+        try:
+            code_key, mtime_str = file_path.stem[len('feat_'):].rsplit('_', 1)
+            mtime_key = int(mtime_str)
+        except ValueError:
+            continue
+        prev = latest_feat.get(code_key)
+        if prev is None:
+            latest_feat[code_key] = (mtime_key, file_path)
+        elif mtime_key > prev[0]:
+            prev[1].unlink(missing_ok=True)
+            deleted_count += 1
+            latest_feat[code_key] = (mtime_key, file_path)
+        else:
+            file_path.unlink(missing_ok=True)
+            deleted_count += 1
+
     logging.info(f"총 {deleted_count}개의 오래된 캐시 파일을 정리했습니다.")
 
 
@@ -165,225 +232,454 @@ def cleanup_old_cache(days=7):
 
 def calculate_advanced_features(df: pd.DataFrame) -> pd.DataFrame:
     """고급 패턴 인식을 위해 기술적 지표를 특징(Feature)으로 추가합니다."""
-    df['RSI'] = ta.momentum.RSIIndicator(close=df['Close'], window=14, fillna=False).rsi()
-    df['MACD'] = ta.trend.MACD(close=df['Close'], fillna=False).macd()
-    df['MACD_Signal'] = ta.trend.MACD(close=df['Close'], fillna=False).macd_signal()
-    df['MACD_Hist'] = ta.trend.MACD(close=df['Close'], fillna=False).macd_diff() 
-
-    bollinger = ta.volatility.BollingerBands(close=df['Close'], window=20, window_dev=2, fillna=False)
-    df['BB_Width'] = bollinger.bollinger_wband()
-
-    df['SMA_20'] = ta.trend.SMAIndicator(close=df['Close'], window=20, fillna=False).sma_indicator()
-    df['SMA_50'] = ta.trend.SMAIndicator(close=df['Close'], window=50, fillna=False).sma_indicator()
-    df['SMA_200'] = ta.trend.SMAIndicator(close=df['Close'], window=200, fillna=False).sma_indicator()
-
-    df['Log_Return'] = np.log(df['Close'] / df['Close'].shift(1))
+    close = df['Close']
+    df['RSI'] = ta.momentum.RSIIndicator(close=close, window=14, fillna=False).rsi()
+
+    # MACD는 ta 래퍼 없이 EMA로 직접 계산 — 산식은 ta와 동일
+    # (ewm(span, min_periods, adjust=False)), 객체 생성/검증 오버헤드만 제거
+    ema_fast = close.ewm(span=12, min_periods=12, adjust=False).mean()
+    ema_slow = close.ewm(span=26, min_periods=26, adjust=False).mean()
+    macd = ema_fast - ema_slow
+    macd_signal = macd.ewm(span=9, min_periods=9, adjust=False).mean()
+    df['MACD'] = macd
+    df['MACD_Signal'] = macd_signal
+    df['MACD_Hist'] = macd - macd_signal
+
+    # 볼린저 밴드 폭: (상단-하단)/중심선 × 100 = 4σ/MA20 × 100
+    sma20 = close.rolling(20).mean()
+    std20 = close.rolling(20).std(ddof=0)
+    df['BB_Width'] = (4.0 * std20 / sma20) * 100.0
+
+    # 단순 이동평균은 pandas rolling(C 구현) 직접 호출 — ta 래퍼 3회분 오버헤드 제거
+    df['SMA_20'] = sma20  # BB 중심선과 동일 — 한 번만 계산
+    df['SMA_50'] = close.rolling(50).mean()
+    df['SMA_200'] = close.rolling(200).mean()
+
+    df['Log_Return'] = np.log(close / close.shift(1))
     df['TREND_CROSS'] = (df['SMA_50'] > df['SMA_200']).astype(int)
 
     feature_subset = ['RSI', 'MACD', 'BB_Width', 'TREND_CROSS', 'SMA_200', 'Log_Return']
     df_with_features = df.copy().dropna(subset=feature_subset)
     return df_with_features
 
+# 국면 클러스터링 특징 컬럼 (적합/예측 양쪽에서 공유)
+REGIME_FEATURES = ['RSI', 'MACD', 'BB_Width', 'TREND_CROSS', 'Log_Return']
+
+# 워커 프로세스에 로드되는 당일 시장 공통 국면 모델 (scaler, kmeans) — 없으면 종목별 적합
+_REGIME_MODEL = None
+
+
+def _init_regime_worker(model_path):
+    """프로세스 풀 initializer: 당일 국면 모델을 워커당 한 번만 로드합니다."""
+    global _REGIME_MODEL
+    if not model_path:
+        return
+    try:
+        with open(model_path, 'rb') as f:
+            _REGIME_MODEL = pickle.load(f)
+    except Exception as e:
+        logging.debug(f"국면 모델 로드 실패 (종목별 적합으로 폴백): {e}")
+        _REGIME_MODEL = None
+
+
+def build_regime_model(items, sample_size=50):
+    """시장 공통 국면 모델을 하루 한 번만 적합하고 경로를 반환합니다.
+
+    국면은 시장 전체 개념인데 기존에는 종목마다 따로 적합해 비용도 크고
+    라벨이 종목 간 비교 불가능했다. 무작위 표본 종목의 특징 행렬을 모아
+    (스케일러, KMeans)를 적합해 CACHE_DIR에 피클로 저장하면, 워커는
+    predict만 수행한다 — 종목당 O(행수×n_init) 적합이 O(1) 예측으로 줄어든다.
+    """
+    model_path = CACHE_DIR / f"regime_model_{TODAY_STR}.pkl"
+    if model_path.exists():
+        return model_path
+
+    rng = np.random.default_rng(42)
+    codes = [(it.get("Code") or it.get("code")) for it in items]
+    picked = rng.choice(len(codes), size=min(sample_size, len(codes)), replace=False)
+
+    mats = []
+    for i in picked:
+        path = DATA_DIR / f"{codes[i]}.parquet"
+        if not path.exists():
+            continue
+        try:
+            df = load_or_build_features(codes[i], path, need_regime=False)
+            if df is None:
+                continue
+            mat = df[REGIME_FEATURES].tail(500).to_numpy(dtype=np.float64)
+            mats.append(mat[~np.isnan(mat).any(axis=1)])
+        except Exception as e:
+            logging.debug(f"[{codes[i]}] 국면 표본 수집 실패: {e}")
+
+    if not mats:
+        return None
+
+    stacked = np.vstack(mats)
+    scaler = StandardScaler()
+    scaled = np.ascontiguousarray(scaler.fit_transform(stacked), dtype=np.float32)
+    kmeans = MiniBatchKMeans(n_clusters=4, random_state=42, n_init=3, batch_size=1024)
+    kmeans.fit(scaled)
+
+    with open(model_path, 'wb') as f:
+        pickle.dump((scaler, kmeans), f)
+    logging.info(f"시장 국면 모델 적합 완료: 표본 {stacked.shape[0]}행 → {model_path.name}")
+    return model_path
+
+
 def add_market_regime_clustering(df_full: pd.DataFrame, n_clusters=4) -> pd.DataFrame:
-    """K-Means 클러스터링을 통해 시장 국면(Market Regime)을 정의하고 할당합니다."""
-    feature_cols = ['RSI', 'MACD', 'BB_Width', 'TREND_CROSS', 'Log_Return'] 
+    """시장 국면(Market Regime) 라벨을 할당합니다 (공통 모델 예측 우선)."""
+    # 이미 라벨이 있으면 재적합하지 않는다 (캐시 프레임 재사용 시)
+    if 'MarketRegime' in df_full.columns:
+        return df_full
+
     min_data_length = 200
 
-    if len(df_full) < min_data_length or not all(col in df_full.columns for col in feature_cols):
-        df_full['MarketRegime'] = -1 
+    if len(df_full) < min_data_length or not all(col in df_full.columns for col in REGIME_FEATURES):
+        df_full['MarketRegime'] = -1
         return df_full
 
-    data = df_full[feature_cols].copy()
+    data = df_full[REGIME_FEATURES].copy()
+
+    # 당일 시장 공통 모델이 있으면 예측만 수행 (종목 간 라벨 비교 가능)
+    if _REGIME_MODEL is not None:
+        scaler, kmeans = _REGIME_MODEL
+        try:
+            df_full['MarketRegime'] = kmeans.predict(
+                np.ascontiguousarray(scaler.transform(data), dtype=np.float32))
+            return df_full
+        except Exception as e:
+            logging.debug(f"국면 모델 예측 실패, 종목별 적합으로 폴백: {e}")
 
     if data.drop_duplicates().shape[0] < n_clusters:
-        df_full['MarketRegime'] = -1 
+        df_full['MarketRegime'] = -1
         return df_full
-    
+
     scaler = StandardScaler()
-    scaled_data = scaler.fit_transform(data) 
+    # float32 연속 배열: 거리 계산(BLAS) 구간의 메모리 대역폭 절반
+    scaled_data = np.ascontiguousarray(scaler.fit_transform(data), dtype=np.float32)
 
     try:
-        kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10, init='k-means++')
-        df_full['MarketRegime'] = kmeans.fit_predict(scaled_data) 
+        # 완전 배치 KMeans(n_init=10)는 종목당 비용이 과도 — 미니배치 Lloyd로 대체
+        # (수백 행 규모 피처에서 국면 라벨 품질 차이는 무시 가능)
+        kmeans = MiniBatchKMeans(n_clusters=n_clusters, random_state=42, n_init=3, batch_size=256)
+        df_full['MarketRegime'] = kmeans.fit_predict(scaled_data)
     except ValueError as e:
         df_full['MarketRegime'] = -1
 
     return df_full
 
 
+def load_or_build_features(code, path, min_rows=250, columns=None, need_rows=250,
+                           need_regime=True):
+    """특징 프레임을 원시 parquet의 mtime을 키로 디스크에 메모이즈합니다.
+
+    특징 프레임은 원시 파일의 순수 함수이므로, 같은 거래일의 두 번째 호출부터는
+    RSI/MACD/BB/SMA 계산과 KMeans 클러스터링 전체를 건너뛴다 (analyze/chart 공용).
+    columns는 캐시 적중 시 읽을 컬럼 목록 (미지정 시 전체),
+    need_rows는 호출부가 실제로 쓰는 최근 행수 (원시 읽기 구간 산정 기준),
+    need_regime=False면 KMeans 국면 클러스터링(종목당 최대 비용 단계)을 생략한다.
+    """
+    mtime = int(path.stat().st_mtime)
+    feat_path = CACHE_DIR / f"feat_{code}_{mtime}.parquet"
+
+    if feat_path.exists():
+        try:
+            cached = pd.read_parquet(feat_path, columns=columns,
+                                     pre_buffer=True, memory_map=True)
+            # 더 짧은 조회 구간으로 만들어진 캐시일 수 있으므로 요청 행수를 덮는지 확인
+            if len(cached) >= need_rows:
+                return cached
+        except Exception as e:
+            logging.debug(f"[{code}] 특징 캐시 읽기 실패, 재계산: {e}")
+
+    # 컬럼 투영 + 날짜 술어를 리더에 내려보낸다: 로우그룹 통계(min/max)로
+    # 오래된 구간을 건너뛰어 다년치 히스토리에서 읽는 바이트가 크게 준다.
+    # SMA 200 워밍업(약 260영업일)을 더한 구간을 달력일로 환산(×1.5)해 컷오프.
+    cutoff = (datetime.now() - timedelta(days=int((need_rows + 260) * 1.5))).date()
+    # pre_buffer는 필요한 컬럼 청크를 병렬로 미리 읽어 디코드와 I/O를 겹친다
+    # (원격/SMB 마운트 DATA_DIR에서 특히 유효, 로컬 SSD에서도 손해 없음)
+    try:
+        df_raw = pd.read_parquet(
+            path, columns=['Date', 'Open', 'High', 'Low', 'Close', 'Volume'],
+            filters=[('Date', '>=', cutoff)],
+            pre_buffer=True, memory_map=True)
+    except Exception:
+        # Date가 인덱스로 저장된 구버전 파일 등은 전체 읽기로 폴백
+        df_raw = pd.read_parquet(path)
+
+    if df_raw.index.dtype != 'datetime64[ns]' and 'Date' in df_raw.columns:
+        df_raw = df_raw.set_index('Date')
+    if df_raw.index.dtype != 'datetime64[ns]':
+        # date32로 저장된 파일은 date 객체로 읽히므로 datetime 인덱스로 통일
+        df_raw.index = pd.to_datetime(df_raw.index)
+
+    if df_raw.empty or len(df_raw) < min_rows:
+        return None
+
+    df_full = calculate_advanced_features(df_raw)
+    if need_regime:
+        df_full = add_market_regime_clustering(df_full)
+
+    try:
+        df_full.to_parquet(feat_path, compression='zstd', index=True)
+    except Exception as e:
+        logging.debug(f"[{code}] 특징 캐시 저장 실패: {e}")
+
+    return df_full[columns] if columns else df_full
+
+
 # ==============================
 # 5. 기술적 분석 패턴 로직
 # ==============================
 
-def find_peaks_and_troughs(df, prominence_ratio=0.005, width=3):
-    """주요 봉우리(Peaks)와 골짜기(Troughs) 인덱스를 찾습니다 (최근 250일 기준)."""
-    recent_df = df.iloc[-250:].copy()
-    if recent_df.empty: return np.array([]), np.array([])
+def find_peaks_and_troughs(close, prominence_ratio=0.005, width=3):
+    """주요 봉우리(Peaks)와 골짜기(Troughs)를 찾습니다 (최근 250일 기준).
+
+    close는 ndarray — 호출부가 만든 배열을 그대로 받아 분석/감지기와 공유한다.
+    반환: (peak_idx, peak_val, trough_idx, trough_val) — 전부 ndarray.
+    """
+    recent = close[-250:]
+    empty = np.array([], dtype=np.int64)
+    if recent.size == 0:
+        return empty, empty.astype(np.float64), empty, empty.astype(np.float64)
     # Note: Use a fixed window for std to prevent instability if data changes often
-    std_dev = recent_df['Close'].std() 
-    prominence_val = std_dev * prominence_ratio 
-    
-    peaks, _ = find_peaks(recent_df['Close'], prominence=prominence_val, width=width)
-    troughs, _ = find_peaks(-recent_df['Close'], prominence=prominence_val, width=width)
-    
-    start_idx = len(df) - len(recent_df)
+    prominence_val = recent.std() * prominence_ratio
+
+    peaks, _ = find_peaks(recent, prominence=prominence_val, width=width)
+    troughs, _ = find_peaks(np.negative(recent), prominence=prominence_val, width=width)
+
+    start_idx = close.size - recent.size
+    peak_idx = peaks + start_idx
+    trough_idx = troughs + start_idx
+    return peak_idx, close[peak_idx], trough_idx, close[trough_idx]
+
+
+_ANALYSIS_WINDOW = 250  # analyze 모드가 항상 건네는 고정 분석 프레임 길이
+
+
+def find_peaks_and_troughs_250(close):
+    """고정 250행 분석 프레임 전용 경로 (analyze 모드).
+
+    빈 배열 분기와 값 배열 구성을 생략하고 인덱스 두 배열만 반환한다 —
+    감지기는 인덱스만 쓰므로 generate_chart용 일반 경로보다 가볍다.
+    """
+    recent = close[-_ANALYSIS_WINDOW:]
+    prominence_val = recent.std() * 0.005
+    start_idx = close.size - recent.size
+
+    peaks, _ = find_peaks(recent, prominence=prominence_val, width=3)
+    troughs, _ = find_peaks(np.negative(recent), prominence=prominence_val, width=3)
     return peaks + start_idx, troughs + start_idx
 
-def find_double_bottom(df, troughs, tolerance=0.05, min_duration=30, min_retrace=0.1):
-    """이중 바닥 (Double Bottom) 패턴을 감지하고 넥라인 가격을 반환합니다."""
-    recent_troughs = [t for t in troughs if t >= len(df) - 250]
+# 커널 상태코드 → 상태 문자열 매핑 (문자열 생성은 파이썬 래퍼에서만 수행)
+_PATTERN_STATUS = {0: 'None', 1: 'Potential', 2: 'Breakout'}
+
+
+@njit(cache=True, fastmath=True)
+def _double_bottom_kernel(close, idx1, idx2, tolerance, min_duration, min_retrace):
+    """이중 바닥 수치 판정 커널. 반환: (상태코드, 넥라인). 상태 -1은 패턴 아님."""
+    if idx2 - idx1 < min_duration:
+        return -1, 0.0
+
+    price1, price2 = close[idx1], close[idx2]
+    min_price = price1 if price1 < price2 else price2
+    max_price = price2 if price1 < price2 else price1
+    if (max_price - min_price) / min_price >= tolerance:
+        return -1, 0.0
+
+    neckline = close[idx1:idx2].max()
+    if (neckline - min_price) / min_price < min_retrace:
+        return -1, 0.0
+
+    current_price = close[-1]
+    if current_price > neckline:
+        return 2, neckline
+
+    retrace_ratio = (current_price - min_price) / (neckline - min_price) if neckline > min_price else 0.0
+    if retrace_ratio > 0.5 and current_price < neckline:
+        return 1, neckline
+
+    return 0, neckline
+
+
+@njit(cache=True, fastmath=True)
+def _triple_bottom_kernel(close, idx1, idx2, idx3, tolerance, min_duration_total, min_retrace):
+    """삼중 바닥 수치 판정 커널. 반환: (상태코드, 넥라인). 상태 -1은 패턴 아님."""
+    if idx3 - idx1 < min_duration_total:
+        return -1, 0.0
+
+    price1, price2, price3 = close[idx1], close[idx2], close[idx3]
+    min_price = min(price1, min(price2, price3))
+    max_price = max(price1, max(price2, price3))
+    if (max_price - min_price) / min_price >= tolerance:
+        return -1, 0.0
+
+    high1 = close[idx1:idx2].max()
+    high2 = close[idx2:idx3].max()
+    neckline = high1 if high1 > high2 else high2
+    if (neckline - min_price) / min_price < min_retrace:
+        return -1, 0.0
+
+    current_price = close[-1]
+    if current_price > neckline:
+        return 2, neckline
+
+    retrace_ratio = (current_price - min_price) / (neckline - min_price) if neckline > min_price else 0.0
+    if retrace_ratio > 0.5 and current_price < neckline:
+        return 1, neckline
+
+    return 0, neckline
+
+
+@njit(cache=True, fastmath=True)
+def _cup_and_handle_kernel(close, peak_right_idx, handle_drop_ratio):
+    """컵 앤 핸들 수치 판정 커널. 반환: (상태코드, 넥라인)."""
+    peak_right_price = close[peak_right_idx]
+    neckline = peak_right_price
+    current_price = close[-1]
+    handle_max_drop = peak_right_price * (1.0 - handle_drop_ratio)
+
+    is_handle_forming = (close[peak_right_idx:].max() <= peak_right_price) \
+        and (current_price > handle_max_drop)
+
+    if is_handle_forming and current_price > neckline:
+        return 2, neckline
+    if is_handle_forming:
+        return 1, neckline
+    return 0, neckline
+
+
+def find_double_bottom(close, troughs, tolerance=0.05, min_duration=30, min_retrace=0.1):
+    """이중 바닥 (Double Bottom) 패턴을 감지하고 넥라인 가격을 반환합니다.
+
+    close는 ndarray — 수치 판정은 njit 커널이 수행하고 (numba 미설치 시에도
+    같은 코드가 numpy로 동작), 문자열 매핑만 파이썬에서 처리한다.
+    """
+    recent_troughs = troughs[troughs >= close.size - 250]
     if len(recent_troughs) < 2: return False, None, None, None
-    
-    idx2, idx1 = recent_troughs[-1], recent_troughs[-2]
-    price1, price2 = df['Close'].iloc[idx1], df['Close'].iloc[idx2]
-    
-    if idx2 - idx1 < min_duration: return False, None, None, None 
-    
-    min_price = min(price1, price2)
-    max_price = max(price1, price2)
-    is_price_matching = (max_price - min_price) / min_price < tolerance
-    if not is_price_matching: return False, None, None, None
-    
-    interim_high = df['Close'].iloc[idx1:idx2].max()
-    neckline = interim_high
-    
-    retrace_from_bottom = neckline - min_price
-    if retrace_from_bottom / min_price < min_retrace: return False, None, None, None 
-    
-    current_price = df['Close'].iloc[-1]
-    
-    is_breakout = current_price > neckline 
-    if is_breakout: return True, neckline, 'Breakout', neckline
-    
-    retrace_ratio = (current_price - min_price) / (neckline - min_price) if neckline > min_price else 0
-    is_potential = retrace_ratio > 0.5 and current_price < neckline
-    if is_potential: return False, neckline, 'Potential', neckline
-    
-    return False, neckline, 'None', neckline 
 
-def find_triple_bottom(df, troughs, tolerance=0.05, min_duration_total=75, min_retrace=0.1):
+    idx2, idx1 = int(recent_troughs[-1]), int(recent_troughs[-2])
+    status, neckline = _double_bottom_kernel(close, idx1, idx2, tolerance, min_duration, min_retrace)
+    if status < 0: return False, None, None, None
+    # np.float64 대신 파이썬 float로 반환 (결과 dict가 numpy 스칼라를 붙들지 않도록)
+    return status == 2, float(neckline), _PATTERN_STATUS[status], float(neckline)
+
+def find_triple_bottom(close, troughs, tolerance=0.05, min_duration_total=75, min_retrace=0.1):
     """삼중 바닥 (Triple Bottom) 패턴을 감지하고 넥라인 가격을 반환합니다."""
-    recent_troughs = [t for t in troughs if t >= len(df) - 250]
+    recent_troughs = troughs[troughs >= close.size - 250]
     if len(recent_troughs) < 3: return False, None, None, None
-    
-    idx3, idx2, idx1 = recent_troughs[-1], recent_troughs[-2], recent_troughs[-3]
-    price1, price2, price3 = df['Close'].iloc[idx1], df['Close'].iloc[idx2], df['Close'].iloc[idx3]
-    
-    if idx3 - idx1 < min_duration_total: return False, None, None, None
-    
-    min_price = min(price1, price2, price3)
-    max_price = max(price1, price2, price3)
-    is_price_matching = (max_price - min_price) / min_price < tolerance
-    if not is_price_matching: return False, None, None, None
-    
-    high1 = df['Close'].iloc[idx1:idx2].max()
-    high2 = df['Close'].iloc[idx2:idx3].max()
-    neckline = max(high1, high2)
-    
-    retrace_from_bottom = neckline - min_price
-    if retrace_from_bottom / min_price < min_retrace: return False, None, None, None
-    
-    current_price = df['Close'].iloc[-1]
-    
-    is_breakout = current_price > neckline
-    if is_breakout: return True, neckline, 'Breakout', neckline
-    
-    retrace_ratio = (current_price - min_price) / (neckline - min_price) if neckline > min_price else 0
-    is_potential = retrace_ratio > 0.5 and current_price < neckline
-    if is_potential: return False, neckline, 'Potential', neckline
-    
-    return False, neckline, 'None', neckline
 
-def find_cup_and_handle(df, peaks, troughs, handle_drop_ratio=0.3):
+    idx3, idx2, idx1 = int(recent_troughs[-1]), int(recent_troughs[-2]), int(recent_troughs[-3])
+    status, neckline = _triple_bottom_kernel(close, idx1, idx2, idx3, tolerance, min_duration_total, min_retrace)
+    if status < 0: return False, None, None, None
+    return status == 2, float(neckline), _PATTERN_STATUS[status], float(neckline)
+
+def find_cup_and_handle(close, peaks, troughs, handle_drop_ratio=0.3):
     """컵 앤 핸들 (Cup and Handle) 패턴을 감지하고 넥라인 가격을 반환합니다."""
-    recent_peaks = [p for p in peaks if p >= len(df) - 250]
+    recent_peaks = peaks[peaks >= close.size - 250]
     if len(recent_peaks) < 2: return False, None, None, None
-    
-    peak_right_idx = recent_peaks[-1]
-    peak_right_price = df['Close'].iloc[peak_right_idx]
-    
-    handle_start_idx = peak_right_idx
-    handle_max_drop = peak_right_price * (1 - handle_drop_ratio) 
-    current_price = df['Close'].iloc[-1]
-    neckline = peak_right_price 
-    
-    is_handle_forming = (df['Close'].iloc[handle_start_idx:].max() <= peak_right_price) 
-    is_handle_forming &= (current_price > handle_max_drop) 
-    
-    if is_handle_forming and current_price > neckline:
-        return True, neckline, 'Breakout', neckline 
-    if is_handle_forming and current_price <= neckline:
-        return False, neckline, 'Potential', neckline 
-        
-    return False, neckline, 'None', neckline 
+
+    status, neckline = _cup_and_handle_kernel(close, int(recent_peaks[-1]), handle_drop_ratio)
+    return status == 2, float(neckline), _PATTERN_STATUS[status], float(neckline)
 
 
 # ==============================
 # 6. 기술적 조건 및 패턴 분석
 # ==============================
 
+@dataclass(slots=True)
+class TechConditions:
+    """check_ma_conditions 결과 구조체 — 종목마다 dict 키 해싱/생성 churn 제거.
+
+    __slots__ 덕에 속성 접근이 고정 오프셋이고, JSON 직렬화 직전에만
+    asdict로 한 번 변환한다 (None 필드는 기존대로 출력에서 제외).
+    """
+    above_ma20: bool = False
+    above_ma50: bool = False
+    above_ma200: bool = False
+    goldencross_50_200_detected: bool = False
+    deadcross_50_200_detected: bool = False
+    market_regime: int = -1
+    pattern_double_bottom_status: Optional[str] = None
+    db_neckline_price: Optional[float] = None
+    pattern_triple_bottom_status: Optional[str] = None
+    pattern_cup_and_handle_status: Optional[str] = None
+    ch_neckline_price: Optional[float] = None
+
+
 def check_ma_conditions(df, periods, analyze_patterns):
-    """이동 평균선 조건 및 패턴 분석을 수행하고 결과를 딕셔너리로 반환합니다."""
-    results = {}
+    """이동 평균선 조건 및 패턴 분석을 수행하고 TechConditions로 반환합니다."""
+    cond = TechConditions()
     ma_cols = {20: 'SMA_20', 50: 'SMA_50', 200: 'SMA_200'}
 
     if len(df) < 200: analyze_patterns = False
 
-    # 1. 주가와 MA 비교
+    # Series→ndarray 변환은 한 번만: 이후 비교는 전부 C 배열 스칼라 접근
+    close = df['Close'].to_numpy(dtype=np.float64, copy=False)
+
+    # 1. 주가와 MA 비교 (지원 기간은 20/50/200 — 구조체 필드와 1:1)
     for p in periods:
         col_name = ma_cols.get(p)
-        if col_name and col_name in df.columns and not df.empty:
-            results[f"above_ma{p}"] = df['Close'].iloc[-1] > df[col_name].iloc[-1]
-        else:
-            results[f"above_ma{p}"] = False
+        if col_name and col_name in df.columns and close.size:
+            ma_arr = df[col_name].to_numpy(dtype=np.float64, copy=False)
+            setattr(cond, f"above_ma{p}", bool(close[-1] > ma_arr[-1]))
 
     # 2. 골든/데드 크로스 감지 (50일선 vs 200일선)
     ma50_col = ma_cols.get(50)
     ma200_col = ma_cols.get(200)
 
     if ma50_col in df.columns and ma200_col in df.columns and len(df) >= 200:
-        ma50_prev, ma50_curr = df[ma50_col].iloc[-2], df[ma50_col].iloc[-1]
-        ma200_prev, ma200_curr = df[ma200_col].iloc[-2], df[ma200_col].iloc[-1]
+        sma50 = df[ma50_col].to_numpy(dtype=np.float64, copy=False)
+        sma200 = df[ma200_col].to_numpy(dtype=np.float64, copy=False)
 
-        results["goldencross_50_200_detected"] = (ma50_prev < ma200_prev and ma50_curr > ma200_curr)
-        results["deadcross_50_200_detected"] = (ma50_prev > ma200_prev and ma50_curr < ma200_curr)
-    else:
-        results["goldencross_50_200_detected"] = False
-        results["deadcross_50_200_detected"] = False
+        cond.goldencross_50_200_detected = bool(sma50[-2] < sma200[-2] and sma50[-1] > sma200[-1])
+        cond.deadcross_50_200_detected = bool(sma50[-2] > sma200[-2] and sma50[-1] < sma200[-1])
 
-    # 3. 기술적 패턴 분석 
+    # 3. 기술적 패턴 분석
     if analyze_patterns:
-        peaks, troughs = find_peaks_and_troughs(df)
-        
-        _, _, db_status, db_price = find_double_bottom(df, troughs)
-        _, _, tb_status, _ = find_triple_bottom(df, troughs)
-        _, _, ch_status, ch_price = find_cup_and_handle(df, peaks, troughs)
-
-        results['pattern_double_bottom_status'] = db_status
-        results['db_neckline_price'] = db_price
-
-        results['pattern_triple_bottom_status'] = tb_status
-
-        results['pattern_cup_and_handle_status'] = ch_status
-        results['ch_neckline_price'] = ch_price
+        # 위에서 만든 close ndarray를 피크 탐지와 감지기 전부가 공유
+        # (분석 프레임은 항상 250행 — 고정 길이 전용 경로 사용)
+        peaks, troughs = find_peaks_and_troughs_250(close)
+        _, _, db_status, db_price = find_double_bottom(close, troughs)
+        _, _, tb_status, _ = find_triple_bottom(close, troughs)
+        _, _, ch_status, ch_price = find_cup_and_handle(close, peaks, troughs)
+
+        cond.pattern_double_bottom_status = db_status
+        cond.db_neckline_price = db_price
+        cond.pattern_triple_bottom_status = tb_status
+        cond.pattern_cup_and_handle_status = ch_status
+        cond.ch_neckline_price = ch_price
 
     # 4. 시장 국면 (Market Regime)
     if 'MarketRegime' in df.columns and not df.empty:
-        results['market_regime'] = int(df['MarketRegime'].iloc[-1])
-    else:
-        results['market_regime'] = -1
+        cond.market_regime = int(df['MarketRegime'].iloc[-1])
 
-    return results
+    return cond
 
 
 # ==============================
 # 7. 분석 실행 및 캐싱 로직
 # ==============================
 
-def analyze_symbol(item, periods, analyze_patterns, pattern_type_filter, symbol_filter=None): 
-    """단일 종목을 분석하고 필터링 조건에 맞는지 확인하여 결과를 반환합니다."""
-    code = item.get("Code") or item.get("code")
-    name = item.get("Name") or item.get("name")
+# 장기 워커의 RSS 증가 억제: 일정 종목 수마다 순환 참조를 한 번씩 정리
+_GC_EVERY = 256
+_gc_counter = 0
+
+
+def _maybe_collect():
+    global _gc_counter
+    _gc_counter += 1
+    if _gc_counter % _GC_EVERY == 0:
+        gc.collect()
+
+
+def analyze_symbol(code, name, periods, analyze_patterns, pattern_type_filter):
+    """단일 종목을 분석하고 필터링 조건에 맞는지 확인하여 결과를 반환합니다.
+
+    프로세스 풀 워커에서 실행되므로 인자는 (code, name) 최소 튜플로 받는다
+    (item 딕셔너리 전체를 피클링하지 않음).
+    """
     path = DATA_DIR / f"{code}.parquet"
 
     if not path.exists():
@@ -391,74 +687,81 @@ def analyze_symbol(item, periods, analyze_patterns, pattern_type_filter, symbol_
         return None
 
     try:
-        df_raw = pd.read_parquet(path)
-        if df_raw.index.dtype != 'datetime64[ns]' and 'Date' in df_raw.columns:
-            df_raw = df_raw.set_index('Date')
-            
-        if df_raw.empty or len(df_raw) < 250:
-            logging.debug(f"[{code}] 데이터 부족 ({len(df_raw)}일).")
+        # MA/크로스 필터는 국면 라벨을 쓰지 않으므로 KMeans 자체를 생략
+        need_regime = pattern_type_filter not in ('ma', 'all_below_ma', 'goldencross', 'deadcross')
+
+        # 캐시 적중 시 분석에 쓰는 컬럼만 읽는다 (컬럼 프루닝)
+        columns = ['Close', 'SMA_20', 'SMA_50', 'SMA_200']
+        if need_regime:
+            columns.append('MarketRegime')
+        df_full = load_or_build_features(code, path, columns=columns,
+                                         need_regime=need_regime)
+        if df_full is None:
+            logging.debug(f"[{code}] 데이터 부족.")
             return None
 
-        df_full = calculate_advanced_features(df_raw)
-        df_full = add_market_regime_clustering(df_full)
-        
-        df_analyze = df_full.iloc[-250:].copy() 
+        df_analyze = df_full.iloc[-250:].copy()
 
         if len(df_analyze) < 200: 
             logging.debug(f"[{code}] 최종 분석 데이터 부족 ({len(df_analyze)}일).")
             return None
 
-        analysis_results = check_ma_conditions(df_analyze, periods, analyze_patterns)
+        cond = check_ma_conditions(df_analyze, periods, analyze_patterns)
 
-        # 필터링 로직 적용
+        # 필터링 로직 적용 (구조체 속성 직접 참조 — .get 폴백 불필요)
         is_match = True
         if pattern_type_filter:
             if pattern_type_filter == 'goldencross':
-                is_match = analysis_results.get("goldencross_50_200_detected", False)
-            elif pattern_type_filter == 'deadcross': 
-                is_match = analysis_results.get("deadcross_50_200_detected", False)
+                is_match = cond.goldencross_50_200_detected
+            elif pattern_type_filter == 'deadcross':
+                is_match = cond.deadcross_50_200_detected
             elif pattern_type_filter in ['double_bottom', 'triple_bottom', 'cup_and_handle']:
-                status_key = f'pattern_{pattern_type_filter}_status'
-                status = analysis_results.get(status_key)
+                status = getattr(cond, f'pattern_{pattern_type_filter}_status')
                 is_match = status in ['Breakout', 'Potential']
             elif pattern_type_filter.startswith('regime:'):
-                if 'market_regime' in analysis_results:
-                    try:
-                        target_regime = int(pattern_type_filter.split(':')[1])
-                        current_regime = analysis_results['market_regime']
-                        is_match = (current_regime == target_regime)
-                    except ValueError:
-                        is_match = False
-                else:
+                try:
+                    is_match = (cond.market_regime == int(pattern_type_filter.split(':')[1]))
+                except ValueError:
                     is_match = False
             elif pattern_type_filter == 'ma':
-                is_match = all(analysis_results.get(f"above_ma{p}", False) for p in periods if p in [20, 50, 200]) # 20, 50, 200만 확인
+                is_match = all(getattr(cond, f"above_ma{p}") for p in periods if p in [20, 50, 200]) # 20, 50, 200만 확인
             elif pattern_type_filter == 'all_below_ma':
+                # 기간마다 Series.get 폴백 체인을 만드는 대신 .iat 스칼라 조회 1회씩
+                # (NaN/결측 컬럼은 기존 폴백과 동일하게 불일치로 처리)
+                last_close = df_analyze['Close'].iat[-1]
+                mas = {
+                    p: (df_analyze[f'SMA_{p}'].iat[-1] if f'SMA_{p}' in df_analyze.columns else np.nan)
+                    for p in periods if p in (20, 50, 200)
+                }
                 is_match = all(
-                    (df_analyze['Close'].iloc[-1] < df_analyze.get(f'SMA_{p}', df_analyze.get(f'ma{p}', 0)).iloc[-1])
-                    for p in periods if p in [20, 50, 200]
+                    (not np.isnan(ma)) and last_close < ma for ma in mas.values()
                 )
             else:
                 is_match = False
 
-        if pattern_type_filter and not is_match: 
+        if pattern_type_filter and not is_match:
             logging.debug(f"[{code}] 필터 '{pattern_type_filter}' 불일치.")
             return None
 
-        if analysis_results:
-            analysis_clean = {k: v for k, v in analysis_results.items() if v is not None}
-            sort_score = analysis_clean.get('market_regime', -1) 
-            
-            return {
-                "ticker": code,
-                "name": name,
-                "technical_conditions": analysis_clean, 
-                "sort_score": sort_score 
-            }
+        # 직렬화 직전에 한 번만 dict로 변환 (None 필드는 기존처럼 제외)
+        analysis_clean = {k: v for k, v in asdict(cond).items() if v is not None}
+
+        return {
+            "ticker": code,
+            "name": name,
+            "technical_conditions": analysis_clean,
+            "sort_score": cond.market_regime
+        }
+    except (FileNotFoundError, ArrowInvalid, ValueError) as e:
+        # 예상 가능한 실패(파일 없음/손상 parquet/스키마 불일치)는 traceback
+        # 포맷 비용 없이 debug로만 남긴다 — 상장폐지 종목이 많은 코퍼스에서 중요
+        logging.debug(f"[{code}] {name} 분석 생략: {type(e).__name__}: {e}")
         return None
     except Exception as e:
         logging.error(f"[ERROR] {code} {name} 분석 실패: {e}\n{traceback.format_exc()}")
         return None
+    finally:
+        _maybe_collect()
 
 def run_analysis(workers, ma_periods_str, analyze_patterns_flag, pattern_type_filter, top_n, symbol_filter=None): 
     """병렬 처리를 이용해 전체 종목 분석을 실행하고, 일일 캐싱을 적용합니다."""
@@ -468,8 +771,14 @@ def run_analysis(workers, ma_periods_str, analyze_patterns_flag, pattern_type_fi
     start_time = time.time()
     periods = [int(p.strip()) for p in ma_periods_str.split(',') if p.strip().isdigit()]
 
-    today_str = datetime.now().strftime("%Y%m%d")
-    analyze_patterns = analyze_patterns_flag or (pattern_type_filter not in [None, 'ma', 'all_below_ma'] and not pattern_type_filter.startswith('regime:'))
+    today_str = TODAY_STR
+
+    # 패턴 감지 여부는 필터가 우선 결정: 크로스/국면/MA 필터는 패턴 결과를
+    # 쓰지 않으므로 --analyze_patterns 플래그로도 scipy 피크 탐지를 강제하지 않는다
+    if pattern_type_filter:
+        analyze_patterns = pattern_type_filter in ('double_bottom', 'triple_bottom', 'cup_and_handle')
+    else:
+        analyze_patterns = analyze_patterns_flag
     
     # 캐시 키를 순수 패턴 기반으로 단순화
     cache_filter_key = f"{pattern_type_filter or 'ma_only'}_{'pattern' if analyze_patterns else 'no_pattern'}"
@@ -477,13 +786,13 @@ def run_analysis(workers, ma_periods_str, analyze_patterns_flag, pattern_type_fi
     cache_path = CACHE_DIR / cache_key
     
     # 캐시 확인 및 로드 (단일 종목 분석이 아닐 때만 캐시 로드 시도)
-    if not symbol_filter and cache_path.exists(): 
+    if not symbol_filter and cache_path.exists():
         try:
-            with open(cache_path, 'r', encoding='utf-8') as f:
-                cached_data = json.load(f)
+            raw = cache_path.read_bytes()
+            # orjson 경로는 C 레벨 파싱 — 수천 종목 결과에서 stdlib 대비 수 배 빠름
+            cached_data = orjson.loads(raw) if ORJSON_AVAILABLE else json.loads(raw)
             logging.info(f"캐시 로드 성공: {cache_key}")
-            sys.stdout.write(json.dumps(cached_data, ensure_ascii=False, indent=None, separators=(',', ':'), cls=CustomJsonEncoder) + "\n")
-            sys.stdout.flush()
+            safe_print_json(cached_data, status_code=0)
             sys.exit(0)
         except Exception as e:
             logging.error(f"캐시 파일 로드/파싱 실패: {e}. 재분석을 시도합니다.")
@@ -513,32 +822,57 @@ def run_analysis(workers, ma_periods_str, analyze_patterns_flag, pattern_type_fi
     logging.info(f"분석 시작 (캐시 미스): 총 {initial_item_count} 종목, 필터: {pattern_type_filter or 'None'}")
     processed_count = 0
 
-    # 스레드 풀을 이용한 병렬 분석
-    with ThreadPoolExecutor(max_workers=workers) as executor:
+    # 분석 본체는 pandas/sklearn/ta 계산으로 GIL을 쥔 CPU 바운드 —
+    # 스레드는 직렬화되므로 프로세스 풀로 코어를 실제로 활용한다.
+    # 피클 비용을 줄이기 위해 item 딕셔너리 대신 (code, name) 튜플만 전달.
+    pairs = [
+        ((item.get("Code") or item.get("code")), (item.get("Name") or item.get("name")))
+        for item in items
+    ]
+
+    # 국면 라벨이 실제로 쓰이는 실행이면 시장 공통 모델을 먼저 1회 적합
+    regime_model_path = None
+    if pattern_type_filter not in ('ma', 'all_below_ma', 'goldencross', 'deadcross'):
+        try:
+            regime_model_path = build_regime_model(items)
+        except Exception as e:
+            logging.error(f"국면 모델 적합 실패 (종목별 적합으로 폴백): {e}")
+
+    with ProcessPoolExecutor(max_workers=workers,
+                             mp_context=mp.get_context("spawn"),
+                             initializer=_init_regime_worker,
+                             initargs=(str(regime_model_path) if regime_model_path else None,)) as executor:
         future_to_item = {
-            executor.submit(analyze_symbol, item, periods, analyze_patterns, pattern_type_filter): item
-            for item in items
+            executor.submit(analyze_symbol, code, name, periods, analyze_patterns, pattern_type_filter): (code, name)
+            for code, name in pairs
         }
 
+        # 진행 JSON은 완료 건마다가 아니라 1% 단위 또는 100ms 간격으로만 출력:
+        # 수천 종목에서 stdout 쓰기/flush 시스템콜과 JSON 인코딩의 ~99%가 사라짐.
+        # 키가 고정 스칼라뿐이라 json.dumps 대신 % 템플릿으로 직접 구성한다.
+        progress_template = ('{"mode":"progress","total_symbols":%d,'
+                             '"processed_symbols":%d,"progress_percent":%.2f}\n')
+        emit_step = max(1, initial_item_count // 100)
+        last_emit = time.monotonic()
+
         for future in as_completed(future_to_item):
             processed_count += 1
-            
-            # 진행 상황 JSON 출력
-            progress_percent = round((processed_count / initial_item_count) * 100, 2) 
-            sys.stdout.write(json.dumps({
-                "mode": "progress",
-                "total_symbols": initial_item_count,
-                "processed_symbols": processed_count,
-                "progress_percent": progress_percent
-            }, ensure_ascii=False, cls=CustomJsonEncoder, indent=None, separators=(',', ':')) + "\n")
-            sys.stdout.flush()
+
+            now = time.monotonic()
+            if (processed_count % emit_step == 0
+                    or processed_count == initial_item_count
+                    or now - last_emit > 0.1):
+                last_emit = now
+                sys.stdout.write(progress_template % (
+                    initial_item_count, processed_count,
+                    (processed_count / initial_item_count) * 100))
+                sys.stdout.flush()
 
             try:
                 r = future.result()
                 if r: results.append(r)
             except Exception as e:
-                code = future_to_item[future].get("Code") or future_to_item[future].get("code")
-                name = future_to_item[future].get("Name") or future_to_item[future].get("name")
+                code, name = future_to_item[future]
                 logging.error(f"[ERROR] {code} {name} 처리 중 예외 발생: {e}")
 
     # 결과 정렬 및 상위 N개 선택
@@ -569,8 +903,16 @@ def run_analysis(workers, ma_periods_str, analyze_patterns_flag, pattern_type_fi
     
     if not symbol_filter:
         try:
-            with open(cache_path, 'w', encoding='utf-8') as f:
-                json.dump(final_output, f, ensure_ascii=False, cls=CustomJsonEncoder, indent=None, separators=(',', ':'))
+            if ORJSON_AVAILABLE:
+                # numpy 스칼라를 isinstance 체인(CustomJsonEncoder) 없이 직렬화
+                cache_path.write_bytes(orjson.dumps(
+                    final_output, default=_orjson_default,
+                    option=(orjson.OPT_SERIALIZE_NUMPY
+                            | orjson.OPT_NON_STR_KEYS
+                            | orjson.OPT_PASSTHROUGH_DATETIME)))
+            else:
+                with open(cache_path, 'w', encoding='utf-8') as f:
+                    json.dump(final_output, f, ensure_ascii=False, cls=CustomJsonEncoder, indent=None, separators=(',', ':'))
             logging.info(f"분석 결과 캐시 저장 완료: {cache_key}")
         except Exception as e:
             logging.error(f"캐시 파일 저장 실패: {e}")
@@ -599,29 +941,37 @@ def generate_chart(symbol, ma_periods_str, chart_period):
         return
 
     try:
-        df = pd.read_parquet(path)
-        
-        if df.index.dtype != 'datetime64[ns]' and 'Date' in df.columns:
-            df = df.set_index('Date')
-            
-        if df.empty:
+        # analyze 모드와 같은 특징 캐시를 공유: 분석이 먼저 돌았으면 차트는 공짜
+        # (패턴 감지가 최근 250일을 보므로 need_rows는 차트 구간과 250 중 큰 쪽)
+        df_full = load_or_build_features(code, path, min_rows=1,
+                                         need_rows=max(chart_period, 250))
+
+        if df_full is None or df_full.empty:
             safe_print_json({"error": "데이터프레임이 비어 있습니다."}, status_code=1)
             return
 
-        df_full = calculate_advanced_features(df)
         df_for_chart = df_full.iloc[-chart_period:].copy()
 
         if df_for_chart.empty:
             safe_print_json({"error": "특징 계산 후 데이터가 부족하여 차트 생성 불가."}, status_code=1)
             return
 
+        # 날짜 문자열은 한 번만 생성해 모든 시리즈 포맷팅이 공유
+        # (iterrows는 행마다 Series를 박싱하므로 zip(ndarray)로 대체)
+        dates = df_for_chart.index.strftime('%Y-%m-%d').to_numpy()
+
         # 1. 캔들스틱 데이터 포맷팅 (OHLCV)
-        ohlcv_data = []
-        for index, row in df_for_chart.iterrows():
-            ohlcv_data.append({
-                "x": index.strftime('%Y-%m-%d'), 
-                "o": row['Open'], "h": row['High'], "l": row['Low'], "c": row['Close'], "v": row['Volume']
-            })
+        ohlcv_data = [
+            {"x": d, "o": o, "h": h, "l": l, "c": c, "v": v}
+            for d, o, h, l, c, v in zip(
+                dates,
+                df_for_chart['Open'].to_numpy(),
+                df_for_chart['High'].to_numpy(),
+                df_for_chart['Low'].to_numpy(),
+                df_for_chart['Close'].to_numpy(),
+                df_for_chart['Volume'].to_numpy(),
+            )
+        ]
 
         # 2. 이동평균선(MA) 데이터 포맷팅
         ma_data = {}
@@ -629,24 +979,22 @@ def generate_chart(symbol, ma_periods_str, chart_period):
             ma_col_name = f'SMA_{p}'
             if ma_col_name not in df_for_chart.columns:
                  # 없는 MA를 다시 계산 (Parquet에 저장되지 않은 경우 대비)
-                 df_for_chart[ma_col_name] = df_for_chart['Close'].rolling(window=p, min_periods=1).mean() 
-
-            ma_values = []
-            for index, row in df_for_chart.iterrows():
-                if not pd.isna(row[ma_col_name]):
-                    ma_values.append({"x": index.strftime('%Y-%m-%d'), "y": row[ma_col_name]})
-            ma_data[f"MA{p}"] = ma_values
-        
-        # 3. MACD 데이터 포맷팅
-        macd_data = {"MACD": [], "Signal": [], "Histogram": []}
-        for index, row in df_for_chart.iterrows():
-            date_str = index.strftime('%Y-%m-%d')
-            if not pd.isna(row['MACD']):
-                macd_data["MACD"].append({"x": date_str, "y": row['MACD']})
-            if not pd.isna(row['MACD_Signal']):
-                macd_data["Signal"].append({"x": date_str, "y": row['MACD_Signal']})
-            if not pd.isna(row['MACD_Hist']):
-                macd_data["Histogram"].append({"x": date_str, "y": row['MACD_Hist']})
+                 df_for_chart[ma_col_name] = df_for_chart['Close'].rolling(window=p, min_periods=1).mean()
+
+            ma_vals = df_for_chart[ma_col_name].to_numpy(dtype=np.float64)
+            mask = ~np.isnan(ma_vals)
+            ma_data[f"MA{p}"] = [
+                {"x": d, "y": y} for d, y in zip(dates[mask], ma_vals[mask])
+            ]
+
+        # 3. MACD 데이터 포맷팅 (시리즈별 NaN 마스크 후 일괄 구성)
+        macd_data = {}
+        for out_key, col in (("MACD", 'MACD'), ("Signal", 'MACD_Signal'), ("Histogram", 'MACD_Hist')):
+            vals = df_for_chart[col].to_numpy(dtype=np.float64)
+            mask = ~np.isnan(vals)
+            macd_data[out_key] = [
+                {"x": d, "y": y} for d, y in zip(dates[mask], vals[mask])
+            ]
 
         # 4. 크로스 지점 감지 및 패턴 넥라인 정보 추가
         cross_data = []
@@ -655,28 +1003,32 @@ def generate_chart(symbol, ma_periods_str, chart_period):
         ma50_col = 'SMA_50'
         ma200_col = 'SMA_200'
         
-        # 4-1. MA 크로스 지점 감지
+        # 4-1. MA 크로스 지점 감지 (시프트된 불리언 배열 한 쌍으로 일괄 판정 —
+        # 교차 지점마다 .loc 스칼라 조회를 반복하던 루프 제거)
         if ma50_col in df_for_chart.columns and ma200_col in df_for_chart.columns:
-            ma_cross = df_for_chart[ma50_col] > df_for_chart[ma200_col]
-            cross_points = ma_cross[ma_cross != ma_cross.shift(1)]
-
-            for date, is_above in cross_points.items():
-                if date == df_for_chart.index[0]: continue
-                prev_above = ma_cross.shift(1).loc[date]
-                cross_type = ""
-                
-                if not prev_above and is_above: cross_type = "GoldenCross"
-                elif prev_above and not is_above: cross_type = "DeadCross"
-                
-                if cross_type:
-                    cross_data.append({"x": date.strftime('%Y-%m-%d'), "y": df_for_chart.loc[date, 'Close'], "type": cross_type})
-
-        # 4-2. 패턴 넥라인 정보 감지
-        peaks_all, troughs_all = find_peaks_and_troughs(df_full)
-        
-        _, db_neckline, db_status, _ = find_double_bottom(df_full, troughs_all)
-        _, tb_neckline, tb_status, _ = find_triple_bottom(df_full, troughs_all)
-        _, ch_neckline, ch_status, _ = find_cup_and_handle(df_full, peaks_all, troughs_all)
+            above = (df_for_chart[ma50_col].to_numpy(dtype=np.float64)
+                     > df_for_chart[ma200_col].to_numpy(dtype=np.float64))
+            close_vals = df_for_chart['Close'].to_numpy()
+
+            gc_idx = np.where(~above[:-1] & above[1:])[0] + 1
+            dc_idx = np.where(above[:-1] & ~above[1:])[0] + 1
+
+            crossings = sorted(
+                [(int(i), "GoldenCross") for i in gc_idx]
+                + [(int(i), "DeadCross") for i in dc_idx]
+            )
+            cross_data = [
+                {"x": dates[i], "y": close_vals[i], "type": cross_type}
+                for i, cross_type in crossings
+            ]
+
+        # 4-2. 패턴 넥라인 정보 감지 (close ndarray 하나를 전 단계가 공유)
+        close_all = df_full['Close'].to_numpy(dtype=np.float64, copy=False)
+        peaks_all, _, troughs_all, _ = find_peaks_and_troughs(close_all)
+
+        _, db_neckline, db_status, _ = find_double_bottom(close_all, troughs_all)
+        _, tb_neckline, tb_status, _ = find_triple_bottom(close_all, troughs_all)
+        _, ch_neckline, ch_status, _ = find_cup_and_handle(close_all, peaks_all, troughs_all)
 
         today_date = df_full.index[-1].strftime('%Y-%m-%d')
         chart_min_close = df_for_chart['Close'].min()
@@ -720,7 +1072,8 @@ def main():
     
     # 요청하신 인자 목록 반영
     parser.add_argument("--mode", type=str, required=True, choices=['analyze', 'chart'], help="실행 모드 선택: 'analyze' 또는 'chart'")
-    parser.add_argument("--workers", type=int, default=os.cpu_count() * 2, help="분석 모드에서 사용할 최대 스레드 수")
+    # 프로세스 풀은 과다 할당이 오히려 해로움 — 코어 수만큼만 기본 배정
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="분석 모드에서 사용할 최대 프로세스 수")
     parser.add_argument("--ma_periods", type=str, default="20,50,200", help="이동 평균선 기간 지정 (쉼표로 구분, 예: 5,20,50)")
     parser.add_argument("--chart_period", type=int, default=250, help="차트 모드에서 표시할 거래일 수 (기본값: 250일)")
     
@@ -739,7 +1092,12 @@ def main():
     
     # 로깅 레벨 설정
     log_level = logging.DEBUG if args.debug else logging.INFO
-    setup_env(log_level=log_level) 
+    setup_env(log_level=log_level)
+
+    # 연결 확인은 main에서만 수행: spawn 워커가 모듈을 재임포트할 때
+    # 워커마다 소켓 연결 검사를 반복하지 않도록 임포트 부수효과를 제거했다.
+    if not check_internet_connection():
+        safe_print_json({"error": "CRITICAL_ERROR", "reason": "인터넷 연결을 확인할 수 없습니다.", "mode": "initial_check"})
     
     if args.mode == 'analyze':
         # analyze_patterns 플래그가 설정되었거나, pattern_type이 MA/Regime 필터가 아닌 경우 패턴 분석 활성화
@@ -13,20 +13,42 @@ import json
 import time
 import logging
 import argparse
-import traceback
 import socket
+from functools import lru_cache
 from pathlib import Path
 from datetime import datetime, timedelta
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import glob
 
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
 from scipy.signal import find_peaks
 import ta
 from sklearn.preprocessing import StandardScaler
 from sklearn.cluster import KMeans
 
+# numba는 선택 사항: 없으면 njit가 원본 함수를 그대로 돌려주는 순수 파이썬 폴백
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ModuleNotFoundError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+# orjson은 선택 사항: 대형 결과 JSON 직렬화를 네이티브 경로로 가속 (없으면 stdlib json)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ModuleNotFoundError:
+    ORJSON_AVAILABLE = False
+
 
 # ==============================
 # 1. 초기 안전 검사 및 필수 라이브러리 임포트
@@ -35,8 +57,8 @@ from sklearn.cluster import KMeans
 def safe_print_json(data, status_code=1):
     """표준 출력(stdout)으로 JSON을 안전하게 출력하고 프로세스를 종료합니다."""
     try:
-        # CustomJsonEncoder를 사용하여 np 타입 및 datetime 객체 처리
-        sys.stdout.write(json.dumps(data, ensure_ascii=False, indent=None, separators=(',', ':'), cls=CustomJsonEncoder) + "\n")
+        # np 타입 및 datetime 객체는 _json_dumps_bytes의 default 훅에서 처리
+        sys.stdout.write(_json_dumps_bytes(data).decode('utf-8') + "\n")
     except Exception as e:
         sys.stdout.write(json.dumps({"error": "JSON_SERIALIZATION_FAIL", "original_error": str(e)}, ensure_ascii=False) + "\n")
         
@@ -55,10 +77,6 @@ def check_internet_connection(host="8.8.8.8", port=53, timeout=3):
     except Exception:
         return False
 
-# 스크립트 시작 시 인터넷 연결 확인
-if not check_internet_connection():
-    safe_print_json({"error": "CRITICAL_ERROR", "reason": "인터넷 연결을 확인할 수 없습니다.", "mode": "initial_check"})
-
 # ==============================
 # 1.5. JSON Custom Encoder 정의
 # ==============================
@@ -79,6 +97,26 @@ class CustomJsonEncoder(json.JSONEncoder):
             return obj.strftime('%Y-%m-%d')
         return json.JSONEncoder.default(self, obj)
 
+def _orjson_default(obj):
+    """orjson이 기본 처리하지 못하는 타입 변환 (CustomJsonEncoder와 동일 규칙)."""
+    if isinstance(obj, np.bool_):
+        return bool(obj)
+    if isinstance(obj, np.floating):
+        return None if np.isnan(obj) else float(obj)
+    if isinstance(obj, set):
+        return list(obj)
+    if isinstance(obj, (pd.Timestamp, datetime, np.datetime64)):
+        return obj.strftime('%Y-%m-%d')
+    raise TypeError(f"직렬화 불가 타입: {type(obj)}")
+
+def _json_dumps_bytes(data):
+    """결과 dict를 compact JSON 바이트로 직렬화합니다 (orjson 우선, stdlib 폴백)."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, default=_orjson_default,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, ensure_ascii=False, indent=None, separators=(',', ':'),
+                      cls=CustomJsonEncoder).encode('utf-8')
+
 
 # ==============================
 # 2. 경로 및 상수 설정
@@ -86,8 +124,9 @@ class CustomJsonEncoder(json.JSONEncoder):
 # → 상위 2단계로 올라가면 /MyBaseLinkV2/python
 BASE_DIR = Path(__file__).resolve().parents[2]
 LOG_DIR = BASE_DIR / "log"
-DATA_DIR = BASE_DIR / "data" / "stock_data" 
-LISTING_FILE = BASE_DIR / "data" / "stock_list" / "stock_listing.json" 
+DATA_DIR = BASE_DIR / "data" / "stock_data"
+FEATURES_DIR = DATA_DIR / "features"
+LISTING_FILE = BASE_DIR / "data" / "stock_list" / "stock_listing.json"
 CACHE_DIR = BASE_DIR / "cache" 
 LOG_FILE = LOG_DIR / "stock_analyzer_ultimate.log"
 
@@ -100,6 +139,7 @@ def setup_env(log_level=logging.INFO):
     """환경 디렉토리를 설정하고 로깅을 초기화합니다."""
     LOG_DIR.mkdir(parents=True, exist_ok=True)
     DATA_DIR.mkdir(parents=True, exist_ok=True)
+    FEATURES_DIR.mkdir(parents=True, exist_ok=True)
     LISTING_FILE.parent.mkdir(parents=True, exist_ok=True)
     CACHE_DIR.mkdir(parents=True, exist_ok=True)
     
@@ -112,8 +152,9 @@ def setup_env(log_level=logging.INFO):
         ]
     )
 
+@lru_cache(maxsize=1)
 def load_listing():
-    """종목 리스트 파일 (stock_listing.json)을 로드합니다."""
+    """종목 리스트 파일 (stock_listing.json)을 로드합니다 (프로세스당 1회만 파싱)."""
     default_item = [{"Code": "005930", "Name": "삼성전자"}]
     if not LISTING_FILE.exists():
         logging.error(f"종목 리스트 파일 없음: {LISTING_FILE}")
@@ -125,8 +166,9 @@ def load_listing():
         logging.error(f"종목 리스트 파일 로드 실패: {e}")
         return default_item
 
+@lru_cache(maxsize=None)
 def get_stock_name(symbol):
-    """종목 코드로 이름을 찾아 반환합니다."""
+    """종목 코드로 이름을 찾아 반환합니다 (코드별 1회만 리스트 스캔)."""
     try:
         items = load_listing()
         for item in items:
@@ -142,8 +184,9 @@ def cleanup_old_cache(days=7):
     
     cutoff_time = datetime.now() - timedelta(days=days)
     
-    cache_files = CACHE_DIR.glob('*.json')
-    
+    # 결과 캐시(JSON)와 특징 사이드카(parquet)를 함께 정리
+    cache_files = list(CACHE_DIR.glob('*.json')) + list(FEATURES_DIR.glob('*.features.parquet'))
+
     deleted_count = 0
     for file_path in cache_files:
         try:
@@ -163,24 +206,95 @@ def cleanup_old_cache(days=7):
 # 4. 고급 특징 공학 및 클러스터링 로직
 # ==============================
 
-def calculate_advanced_features(df: pd.DataFrame) -> pd.DataFrame:
-    """고급 패턴 인식을 위해 기술적 지표를 특징(Feature)으로 추가합니다."""
+@njit(cache=True, fastmath=True)
+def _sma_macd_kernel(close):
+    """SMA 20/50/200과 MACD 계열을 close 배열 1회 순회로 동시에 계산합니다.
+
+    이동합(running sum)으로 SMA를, adjust=False 재귀식으로 EMA를 계산하며,
+    ta 라이브러리와 동일하게 min_periods 이전 구간은 NaN으로 둡니다."""
+    n = close.shape[0]
+    sma20 = np.full(n, np.nan)
+    sma50 = np.full(n, np.nan)
+    sma200 = np.full(n, np.nan)
+    macd = np.full(n, np.nan)
+    signal = np.full(n, np.nan)
+    hist = np.full(n, np.nan)
+
+    a12 = 2.0 / 13.0
+    a26 = 2.0 / 27.0
+    a9 = 2.0 / 10.0
+
+    s20 = 0.0; s50 = 0.0; s200 = 0.0
+    ema12 = 0.0; ema26 = 0.0; ema9 = 0.0
+
+    for i in range(n):
+        c = close[i]
+        s20 += c; s50 += c; s200 += c
+        if i >= 20: s20 -= close[i - 20]
+        if i >= 50: s50 -= close[i - 50]
+        if i >= 200: s200 -= close[i - 200]
+        if i >= 19: sma20[i] = s20 / 20.0
+        if i >= 49: sma50[i] = s50 / 50.0
+        if i >= 199: sma200[i] = s200 / 200.0
+
+        if i == 0:
+            ema12 = c
+            ema26 = c
+        else:
+            ema12 = a12 * c + (1.0 - a12) * ema12
+            ema26 = a26 * c + (1.0 - a26) * ema26
+        if i >= 25:
+            m = ema12 - ema26
+            macd[i] = m
+            # 시그널 EMA는 MACD가 처음 유효해지는 지점부터 누적 (min_periods=9)
+            if i == 25:
+                ema9 = m
+            else:
+                ema9 = a9 * m + (1.0 - a9) * ema9
+            if i >= 33:
+                signal[i] = ema9
+                hist[i] = m - ema9
+
+    return sma20, sma50, sma200, macd, signal, hist
+
+def calculate_advanced_features(df: pd.DataFrame, needs_macd: bool = True) -> pd.DataFrame:
+    """고급 패턴 인식을 위해 기술적 지표를 특징(Feature)으로 추가합니다.
+
+    needs_macd=False면 MACD 계열 계산을 생략합니다 (MA/크로스 필터 전용 경로)."""
     df['RSI'] = ta.momentum.RSIIndicator(close=df['Close'], window=14, fillna=False).rsi()
-    df['MACD'] = ta.trend.MACD(close=df['Close'], fillna=False).macd()
-    df['MACD_Signal'] = ta.trend.MACD(close=df['Close'], fillna=False).macd_signal()
-    df['MACD_Hist'] = ta.trend.MACD(close=df['Close'], fillna=False).macd_diff() 
+
+    if NUMBA_AVAILABLE:
+        # SMA 3종 + MACD 3종을 융합 커널 한 번의 순회로 계산 (O(N) 패스 6회 → 1회)
+        sma20, sma50, sma200, macd, macd_signal, macd_hist = _sma_macd_kernel(
+            df['Close'].to_numpy(dtype=np.float64))
+        if needs_macd:
+            df['MACD'] = macd
+            df['MACD_Signal'] = macd_signal
+            df['MACD_Hist'] = macd_hist
+        df['SMA_20'] = sma20
+        df['SMA_50'] = sma50
+        df['SMA_200'] = sma200
+    else:
+        if needs_macd:
+            macd_ind = ta.trend.MACD(close=df['Close'], fillna=False)
+            df['MACD'] = macd_ind.macd()
+            df['MACD_Signal'] = macd_ind.macd_signal()
+            df['MACD_Hist'] = macd_ind.macd_diff()
+
+        df['SMA_20'] = ta.trend.SMAIndicator(close=df['Close'], window=20, fillna=False).sma_indicator()
+        df['SMA_50'] = ta.trend.SMAIndicator(close=df['Close'], window=50, fillna=False).sma_indicator()
+        df['SMA_200'] = ta.trend.SMAIndicator(close=df['Close'], window=200, fillna=False).sma_indicator()
 
     bollinger = ta.volatility.BollingerBands(close=df['Close'], window=20, window_dev=2, fillna=False)
     df['BB_Width'] = bollinger.bollinger_wband()
 
-    df['SMA_20'] = ta.trend.SMAIndicator(close=df['Close'], window=20, fillna=False).sma_indicator()
-    df['SMA_50'] = ta.trend.SMAIndicator(close=df['Close'], window=50, fillna=False).sma_indicator()
-    df['SMA_200'] = ta.trend.SMAIndicator(close=df['Close'], window=200, fillna=False).sma_indicator()
-
     df['Log_Return'] = np.log(df['Close'] / df['Close'].shift(1))
     df['TREND_CROSS'] = (df['SMA_50'] > df['SMA_200']).astype(int)
 
-    feature_subset = ['RSI', 'MACD', 'BB_Width', 'TREND_CROSS', 'SMA_200', 'Log_Return']
+    # SMA_200의 NaN 구간이 가장 길어 행 수는 MACD 포함 여부와 무관하게 동일함
+    feature_subset = ['RSI', 'BB_Width', 'TREND_CROSS', 'SMA_200', 'Log_Return']
+    if needs_macd:
+        feature_subset.insert(1, 'MACD')
     df_with_features = df.copy().dropna(subset=feature_subset)
     return df_with_features
 
@@ -217,105 +331,123 @@ def add_market_regime_clustering(df_full: pd.DataFrame, n_clusters=4) -> pd.Data
 
 def find_peaks_and_troughs(df, prominence_ratio=0.005, width=3):
     """주요 봉우리(Peaks)와 골짜기(Troughs) 인덱스를 찾습니다 (최근 250일 기준)."""
-    recent_df = df.iloc[-250:].copy()
-    if recent_df.empty: return np.array([]), np.array([])
+    # DataFrame 복사/Series 래핑 없이 연속 float64 뷰를 scipy C 루프에 그대로 전달
+    close = df['Close'].to_numpy(dtype=np.float64, copy=False)[-250:]
+    if close.size == 0: return np.array([]), np.array([])
     # Note: Use a fixed window for std to prevent instability if data changes often
-    std_dev = recent_df['Close'].std() 
-    prominence_val = std_dev * prominence_ratio 
-    
-    peaks, _ = find_peaks(recent_df['Close'], prominence=prominence_val, width=width)
-    troughs, _ = find_peaks(-recent_df['Close'], prominence=prominence_val, width=width)
-    
-    start_idx = len(df) - len(recent_df)
+    prominence_val = close.std() * prominence_ratio
+
+    # 골짜기 탐지용 부호 반전은 out= 버퍼로 한 번만 (Series 음수화 경로 제거)
+    neg = np.empty_like(close)
+    np.negative(close, out=neg)
+
+    peaks, _ = find_peaks(close, prominence=prominence_val, width=width)
+    troughs, _ = find_peaks(neg, prominence=prominence_val, width=width)
+
+    start_idx = len(df) - close.size
     return peaks + start_idx, troughs + start_idx
 
-def find_double_bottom(df, troughs, tolerance=0.05, min_duration=30, min_retrace=0.1):
+# 커널 상태 코드 → 패턴 상태 문자열 매핑 (-1은 조기 탈락)
+_PATTERN_STATUS = {0: 'None', 1: 'Potential', 2: 'Breakout'}
+
+@njit(cache=True, fastmath=True)
+def _double_bottom_kernel(close, idx1, idx2, current_price, tolerance, min_duration, min_retrace):
+    """이중 바닥 수치 판정 커널. (상태 코드, 넥라인)을 반환합니다."""
+    if idx2 - idx1 < min_duration:
+        return -1, 0.0
+    price1 = close[idx1]
+    price2 = close[idx2]
+    min_price = price1 if price1 < price2 else price2
+    max_price = price2 if price1 < price2 else price1
+    if (max_price - min_price) / min_price >= tolerance:
+        return -1, 0.0
+    neckline = close[idx1]
+    for k in range(idx1 + 1, idx2):
+        if close[k] > neckline:
+            neckline = close[k]
+    if (neckline - min_price) / min_price < min_retrace:
+        return -1, 0.0
+    if current_price > neckline:
+        return 2, neckline
+    retrace_ratio = (current_price - min_price) / (neckline - min_price) if neckline > min_price else 0.0
+    if retrace_ratio > 0.5 and current_price < neckline:
+        return 1, neckline
+    return 0, neckline
+
+@njit(cache=True, fastmath=True)
+def _triple_bottom_kernel(close, idx1, idx2, idx3, current_price, tolerance, min_duration_total, min_retrace):
+    """삼중 바닥 수치 판정 커널. (상태 코드, 넥라인)을 반환합니다."""
+    if idx3 - idx1 < min_duration_total:
+        return -1, 0.0
+    min_price = close[idx1]
+    max_price = close[idx1]
+    for idx in (idx2, idx3):
+        if close[idx] < min_price:
+            min_price = close[idx]
+        if close[idx] > max_price:
+            max_price = close[idx]
+    if (max_price - min_price) / min_price >= tolerance:
+        return -1, 0.0
+    neckline = close[idx1]
+    for k in range(idx1 + 1, idx3):
+        if close[k] > neckline:
+            neckline = close[k]
+    if (neckline - min_price) / min_price < min_retrace:
+        return -1, 0.0
+    if current_price > neckline:
+        return 2, neckline
+    retrace_ratio = (current_price - min_price) / (neckline - min_price) if neckline > min_price else 0.0
+    if retrace_ratio > 0.5 and current_price < neckline:
+        return 1, neckline
+    return 0, neckline
+
+if NUMBA_AVAILABLE:
+    # import 시 더미 호출로 JIT 캐시를 데워 첫 종목 분석에서의 컴파일 지연 제거
+    _warm = np.linspace(1.0, 2.0, 8)
+    _double_bottom_kernel(_warm, 0, 4, 2.0, 0.05, 1, 0.0)
+    _triple_bottom_kernel(_warm, 0, 3, 6, 2.0, 0.05, 1, 0.0)
+    _sma_macd_kernel(_warm)
+    del _warm
+
+def find_double_bottom(close, recent_troughs, current_price, tolerance=0.05, min_duration=30, min_retrace=0.1):
     """이중 바닥 (Double Bottom) 패턴을 감지하고 넥라인 가격을 반환합니다."""
-    recent_troughs = [t for t in troughs if t >= len(df) - 250]
     if len(recent_troughs) < 2: return False, None, None, None
-    
-    idx2, idx1 = recent_troughs[-1], recent_troughs[-2]
-    price1, price2 = df['Close'].iloc[idx1], df['Close'].iloc[idx2]
-    
-    if idx2 - idx1 < min_duration: return False, None, None, None 
-    
-    min_price = min(price1, price2)
-    max_price = max(price1, price2)
-    is_price_matching = (max_price - min_price) / min_price < tolerance
-    if not is_price_matching: return False, None, None, None
-    
-    interim_high = df['Close'].iloc[idx1:idx2].max()
-    neckline = interim_high
-    
-    retrace_from_bottom = neckline - min_price
-    if retrace_from_bottom / min_price < min_retrace: return False, None, None, None 
-    
-    current_price = df['Close'].iloc[-1]
-    
-    is_breakout = current_price > neckline 
-    if is_breakout: return True, neckline, 'Breakout', neckline
-    
-    retrace_ratio = (current_price - min_price) / (neckline - min_price) if neckline > min_price else 0
-    is_potential = retrace_ratio > 0.5 and current_price < neckline
-    if is_potential: return False, neckline, 'Potential', neckline
-    
-    return False, neckline, 'None', neckline 
 
-def find_triple_bottom(df, troughs, tolerance=0.05, min_duration_total=75, min_retrace=0.1):
+    status, neckline = _double_bottom_kernel(
+        close, int(recent_troughs[-2]), int(recent_troughs[-1]), current_price,
+        tolerance, min_duration, min_retrace)
+    if status < 0: return False, None, None, None
+    return status == 2, neckline, _PATTERN_STATUS[status], neckline
+
+def find_triple_bottom(close, recent_troughs, current_price, tolerance=0.05, min_duration_total=75, min_retrace=0.1):
     """삼중 바닥 (Triple Bottom) 패턴을 감지하고 넥라인 가격을 반환합니다."""
-    recent_troughs = [t for t in troughs if t >= len(df) - 250]
     if len(recent_troughs) < 3: return False, None, None, None
-    
-    idx3, idx2, idx1 = recent_troughs[-1], recent_troughs[-2], recent_troughs[-3]
-    price1, price2, price3 = df['Close'].iloc[idx1], df['Close'].iloc[idx2], df['Close'].iloc[idx3]
-    
-    if idx3 - idx1 < min_duration_total: return False, None, None, None
-    
-    min_price = min(price1, price2, price3)
-    max_price = max(price1, price2, price3)
-    is_price_matching = (max_price - min_price) / min_price < tolerance
-    if not is_price_matching: return False, None, None, None
-    
-    high1 = df['Close'].iloc[idx1:idx2].max()
-    high2 = df['Close'].iloc[idx2:idx3].max()
-    neckline = max(high1, high2)
-    
-    retrace_from_bottom = neckline - min_price
-    if retrace_from_bottom / min_price < min_retrace: return False, None, None, None
-    
-    current_price = df['Close'].iloc[-1]
-    
-    is_breakout = current_price > neckline
-    if is_breakout: return True, neckline, 'Breakout', neckline
-    
-    retrace_ratio = (current_price - min_price) / (neckline - min_price) if neckline > min_price else 0
-    is_potential = retrace_ratio > 0.5 and current_price < neckline
-    if is_potential: return False, neckline, 'Potential', neckline
-    
-    return False, neckline, 'None', neckline
 
-def find_cup_and_handle(df, peaks, troughs, handle_drop_ratio=0.3):
+    status, neckline = _triple_bottom_kernel(
+        close, int(recent_troughs[-3]), int(recent_troughs[-2]), int(recent_troughs[-1]),
+        current_price, tolerance, min_duration_total, min_retrace)
+    if status < 0: return False, None, None, None
+    return status == 2, neckline, _PATTERN_STATUS[status], neckline
+
+def find_cup_and_handle(close, recent_peaks, current_price, handle_drop_ratio=0.3):
     """컵 앤 핸들 (Cup and Handle) 패턴을 감지하고 넥라인 가격을 반환합니다."""
-    recent_peaks = [p for p in peaks if p >= len(df) - 250]
     if len(recent_peaks) < 2: return False, None, None, None
-    
-    peak_right_idx = recent_peaks[-1]
-    peak_right_price = df['Close'].iloc[peak_right_idx]
-    
-    handle_start_idx = peak_right_idx
-    handle_max_drop = peak_right_price * (1 - handle_drop_ratio) 
-    current_price = df['Close'].iloc[-1]
-    neckline = peak_right_price 
-    
-    is_handle_forming = (df['Close'].iloc[handle_start_idx:].max() <= peak_right_price) 
-    is_handle_forming &= (current_price > handle_max_drop) 
-    
+
+    peak_right_idx = int(recent_peaks[-1])
+    peak_right_price = close[peak_right_idx]
+
+    handle_max_drop = peak_right_price * (1 - handle_drop_ratio)
+    neckline = peak_right_price
+
+    is_handle_forming = (close[peak_right_idx:].max() <= peak_right_price)
+    is_handle_forming &= (current_price > handle_max_drop)
+
     if is_handle_forming and current_price > neckline:
-        return True, neckline, 'Breakout', neckline 
+        return True, neckline, 'Breakout', neckline
     if is_handle_forming and current_price <= neckline:
-        return False, neckline, 'Potential', neckline 
-        
-    return False, neckline, 'None', neckline 
+        return False, neckline, 'Potential', neckline
+
+    return False, neckline, 'None', neckline
 
 
 # ==============================
@@ -329,11 +461,12 @@ def check_ma_conditions(df, periods, analyze_patterns):
 
     if len(df) < 200: analyze_patterns = False
 
-    # 1. 주가와 MA 비교
+    # 1. 주가와 MA 비교 (.iat 스칼라 접근: .iloc 대비 디스패치 비용 낮음)
+    close_last = df['Close'].iat[-1] if not df.empty else None
     for p in periods:
         col_name = ma_cols.get(p)
-        if col_name and col_name in df.columns and not df.empty:
-            results[f"above_ma{p}"] = df['Close'].iloc[-1] > df[col_name].iloc[-1]
+        if col_name and col_name in df.columns and close_last is not None:
+            results[f"above_ma{p}"] = close_last > df[col_name].iat[-1]
         else:
             results[f"above_ma{p}"] = False
 
@@ -342,8 +475,8 @@ def check_ma_conditions(df, periods, analyze_patterns):
     ma200_col = ma_cols.get(200)
 
     if ma50_col in df.columns and ma200_col in df.columns and len(df) >= 200:
-        ma50_prev, ma50_curr = df[ma50_col].iloc[-2], df[ma50_col].iloc[-1]
-        ma200_prev, ma200_curr = df[ma200_col].iloc[-2], df[ma200_col].iloc[-1]
+        ma50_prev, ma50_curr = df[ma50_col].iat[-2], df[ma50_col].iat[-1]
+        ma200_prev, ma200_curr = df[ma200_col].iat[-2], df[ma200_col].iat[-1]
 
         results["goldencross_50_200_detected"] = (ma50_prev < ma200_prev and ma50_curr > ma200_curr)
         results["deadcross_50_200_detected"] = (ma50_prev > ma200_prev and ma50_curr < ma200_curr)
@@ -351,13 +484,21 @@ def check_ma_conditions(df, periods, analyze_patterns):
         results["goldencross_50_200_detected"] = False
         results["deadcross_50_200_detected"] = False
 
-    # 3. 기술적 패턴 분석 
+    # 3. 기술적 패턴 분석
     if analyze_patterns:
         peaks, troughs = find_peaks_and_troughs(df)
-        
-        _, _, db_status, db_price = find_double_bottom(df, troughs)
-        _, _, tb_status, _ = find_triple_bottom(df, troughs)
-        _, _, ch_status, ch_price = find_cup_and_handle(df, peaks, troughs)
+
+        # 최근 250일 윈도 필터, 종가 배열, 현재가는 여기서 1회만 계산해 각 패턴 함수가 공유
+        close_arr = df['Close'].to_numpy(dtype=np.float64, copy=False)
+        # find_peaks는 오름차순 인덱스를 반환하므로 이진 탐색으로 분할점만 찾아 슬라이스
+        threshold = len(df) - 250
+        recent_troughs = troughs[np.searchsorted(troughs, threshold):]
+        recent_peaks = peaks[np.searchsorted(peaks, threshold):]
+        current_price = close_arr[-1]
+
+        _, _, db_status, db_price = find_double_bottom(close_arr, recent_troughs, current_price)
+        _, _, tb_status, _ = find_triple_bottom(close_arr, recent_troughs, current_price)
+        _, _, ch_status, ch_price = find_cup_and_handle(close_arr, recent_peaks, current_price)
 
         results['pattern_double_bottom_status'] = db_status
         results['db_neckline_price'] = db_price
@@ -380,10 +521,81 @@ def check_ma_conditions(df, periods, analyze_patterns):
 # 7. 분석 실행 및 캐싱 로직
 # ==============================
 
-def analyze_symbol(item, periods, analyze_patterns, pattern_type_filter, symbol_filter=None): 
+# 분석/차트 경로가 실제로 사용하는 원본 컬럼 (그 외 컬럼은 읽지 않음)
+_OHLCV_COLS = ('Open', 'High', 'Low', 'Close', 'Volume')
+
+def _read_raw_parquet(raw_path):
+    """원본 parquet에서 OHLCV(+Date) 컬럼만 투영하여 읽습니다.
+
+    스키마 메타데이터만 먼저 확인하므로 부가 컬럼이 많은 파일일수록
+    스캔 바이트와 메모리가 비례해서 줄어듭니다. 실패 시 전체 로드로 폴백."""
+    try:
+        schema_names = set(pq.read_schema(raw_path).names)
+        use_cols = [c for c in _OHLCV_COLS if c in schema_names]
+        if 'Date' in schema_names:
+            use_cols.append('Date')
+        if use_cols:
+            return pd.read_parquet(raw_path, columns=use_cols, engine='pyarrow')
+    except Exception as e:
+        logging.debug(f"컬럼 투영 읽기 실패 -> 전체 로드 ({raw_path.name}): {e}")
+    return pd.read_parquet(raw_path)
+
+def _load_or_build_features(code, raw_path, needs_macd=True, needs_regime=True):
+    """특징 계산 결과를 원본 parquet의 mtime을 키로 사이드카에 캐시합니다.
+
+    장중 재실행 시 원본이 바뀌지 않았다면 특징 공학/클러스터링을 전부 건너뛰고
+    미리 계산된 프레임을 메모리 맵으로 바로 적재합니다. 데이터가 부족하면 None.
+    needs_macd/needs_regime이 꺼진 부분 계산은 사이드카에 저장하지 않습니다
+    (사이드카는 항상 전체 특징을 담아 어떤 필터의 적중에도 대응)."""
+    raw_mtime = raw_path.stat().st_mtime_ns
+    # 원본 OHLCV 캐시 디렉토리를 오염시키지 않도록 전용 하위 디렉토리에 격리
+    sidecar = FEATURES_DIR / f"{code}.features.parquet"
+
+    if sidecar.exists():
+        try:
+            meta = pq.read_metadata(sidecar).metadata or {}
+            if meta.get(b'raw_mtime') == str(raw_mtime).encode():
+                return pq.read_table(sidecar, memory_map=True).to_pandas(self_destruct=True)
+        except Exception as e:
+            logging.debug(f"[{code}] 특징 사이드카 로드 실패 -> 재계산: {e}")
+
+    df_raw = _read_raw_parquet(raw_path)
+    if df_raw.index.dtype != 'datetime64[ns]' and 'Date' in df_raw.columns:
+        df_raw = df_raw.set_index('Date')
+
+    if df_raw.empty or len(df_raw) < 250:
+        return None
+
+    # MA/패턴/클러스터링 연산에는 float32 정밀도로 충분 (원화 가격 기준 ~7자리)
+    # 컬럼 폭 절반 → 메모리 대역폭 절반, numpy 벡터 연산 처리량 증가
+    df_raw = df_raw.astype(
+        {c: np.float32 for c in ('Open', 'High', 'Low', 'Close') if c in df_raw.columns},
+        copy=False)
+
+    df_full = calculate_advanced_features(df_raw, needs_macd=needs_macd)
+    if needs_regime:
+        df_full = add_market_regime_clustering(df_full)
+
+    if not (needs_macd and needs_regime):
+        return df_full
+
+    try:
+        # spawn 워커는 setup_env를 거치지 않으므로 여기서 디렉토리 보장
+        FEATURES_DIR.mkdir(parents=True, exist_ok=True)
+        table = pa.Table.from_pandas(df_full)
+        table = table.replace_schema_metadata(
+            {**(table.schema.metadata or {}), b'raw_mtime': str(raw_mtime).encode()})
+        # 임시 파일에 쓴 뒤 교체 (병렬 워커 간 부분 파일 노출 방지)
+        tmp_path = sidecar.with_suffix('.tmp')
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, sidecar)
+    except Exception as e:
+        logging.debug(f"[{code}] 특징 사이드카 저장 실패: {e}")
+
+    return df_full
+
+def analyze_symbol(code, name, periods, analyze_patterns, pattern_type_filter):
     """단일 종목을 분석하고 필터링 조건에 맞는지 확인하여 결과를 반환합니다."""
-    code = item.get("Code") or item.get("code")
-    name = item.get("Name") or item.get("name")
     path = DATA_DIR / f"{code}.parquet"
 
     if not path.exists():
@@ -391,20 +603,23 @@ def analyze_symbol(item, periods, analyze_patterns, pattern_type_filter, symbol_
         return None
 
     try:
-        df_raw = pd.read_parquet(path)
-        if df_raw.index.dtype != 'datetime64[ns]' and 'Date' in df_raw.columns:
-            df_raw = df_raw.set_index('Date')
-            
-        if df_raw.empty or len(df_raw) < 250:
-            logging.debug(f"[{code}] 데이터 부족 ({len(df_raw)}일).")
+        # 필터 유형별로 실제 필요한 특징만 계산 (MA/크로스 필터는 MACD/클러스터링 불필요)
+        # 시장 국면은 regime 필터 외에 정렬 점수(sort_score)로도 쓰이므로
+        # MA/크로스 계열 필터에서만 생략 (패턴/무필터 결과는 국면 순 정렬 유지)
+        needs_regime = pattern_type_filter not in ('ma', 'all_below_ma', 'goldencross', 'deadcross')
+        needs_macd = analyze_patterns or needs_regime
+
+        df_full = _load_or_build_features(code, path, needs_macd=needs_macd, needs_regime=needs_regime)
+        if df_full is None:
+            logging.debug(f"[{code}] 데이터 부족.")
             return None
 
-        df_full = calculate_advanced_features(df_raw)
-        df_full = add_market_regime_clustering(df_full)
-        
-        df_analyze = df_full.iloc[-250:].copy() 
+        df_analyze = df_full.iloc[-250:].copy()
+        # 전체 기간 프레임은 즉시 해제: 10년치 데이터면 분석 구간의 10배에 달하는
+        # 행이 워커 RSS에 남는 것을 방지 (이후 로직은 df_analyze만 사용)
+        del df_full
 
-        if len(df_analyze) < 200: 
+        if len(df_analyze) < 200:
             logging.debug(f"[{code}] 최종 분석 데이터 부족 ({len(df_analyze)}일).")
             return None
 
@@ -457,7 +672,8 @@ def analyze_symbol(item, periods, analyze_patterns, pattern_type_filter, symbol_
             }
         return None
     except Exception as e:
-        logging.error(f"[ERROR] {code} {name} 분석 실패: {e}\n{traceback.format_exc()}")
+        # exc_info=True: 핸들러가 실제 출력할 때만 스택을 포맷 (무조건적인 format_exc 제거)
+        logging.error("[ERROR] %s %s 분석 실패: %s", code, name, e, exc_info=True)
         return None
 
 def run_analysis(workers, ma_periods_str, analyze_patterns_flag, pattern_type_filter, top_n, symbol_filter=None): 
@@ -482,7 +698,7 @@ def run_analysis(workers, ma_periods_str, analyze_patterns_flag, pattern_type_fi
             with open(cache_path, 'r', encoding='utf-8') as f:
                 cached_data = json.load(f)
             logging.info(f"캐시 로드 성공: {cache_key}")
-            sys.stdout.write(json.dumps(cached_data, ensure_ascii=False, indent=None, separators=(',', ':'), cls=CustomJsonEncoder) + "\n")
+            sys.stdout.write(_json_dumps_bytes(cached_data).decode('utf-8') + "\n")
             sys.stdout.flush()
             sys.exit(0)
         except Exception as e:
@@ -493,7 +709,9 @@ def run_analysis(workers, ma_periods_str, analyze_patterns_flag, pattern_type_fi
     if 200 not in periods: periods.append(200)
 
     items = load_listing()
-    
+    # 필터링 전에 전체 종목 수를 먼저 확보 (리스팅 파일 중복 로드 방지)
+    total_symbols_loaded = len(items)
+
     # 단일 종목 필터링 로직
     if symbol_filter:
         items = [item for item in items if (item.get("Code") or item.get("code")) == symbol_filter]
@@ -501,10 +719,9 @@ def run_analysis(workers, ma_periods_str, analyze_patterns_flag, pattern_type_fi
             logging.error(f"지정된 종목 코드({symbol_filter})를 리스팅에서 찾을 수 없습니다.")
             safe_print_json({"error": "SYMBOL_NOT_FOUND", "ticker": symbol_filter}, status_code=1)
             return
-    
-    initial_item_count = len(items) 
-    total_symbols_loaded = len(load_listing()) 
-    
+
+    initial_item_count = len(items)
+
     if initial_item_count == 0:
         safe_print_json({"error": "LISTING_DATA_EMPTY" if not symbol_filter else "SYMBOL_NOT_FOUND"}, status_code=1)
         return
@@ -513,25 +730,36 @@ def run_analysis(workers, ma_periods_str, analyze_patterns_flag, pattern_type_fi
     logging.info(f"분석 시작 (캐시 미스): 총 {initial_item_count} 종목, 필터: {pattern_type_filter or 'None'}")
     processed_count = 0
 
-    # 스레드 풀을 이용한 병렬 분석
-    with ThreadPoolExecutor(max_workers=workers) as executor:
+    # 프로세스 풀을 이용한 병렬 분석 (CPU 바운드 작업이므로 GIL 회피)
+    # spawn 컨텍스트로 부모의 pandas/sklearn 상태 복사 없이 깨끗하게 기동
+    pool_workers = min(workers, os.cpu_count() or 1)
+    mp_ctx = mp.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=pool_workers, mp_context=mp_ctx) as executor:
+        # 직렬화 비용 최소화를 위해 dict 대신 (code, name)만 워커로 전달
         future_to_item = {
-            executor.submit(analyze_symbol, item, periods, analyze_patterns, pattern_type_filter): item
+            executor.submit(analyze_symbol,
+                            item.get("Code") or item.get("code"),
+                            item.get("Name") or item.get("name"),
+                            periods, analyze_patterns, pattern_type_filter): item
             for item in items
         }
 
+        # 종목마다 flush(시스템 콜)하지 않도록 진행률 출력을 ~200단계로 스로틀링
+        progress_step = max(1, initial_item_count // 200)
+
         for future in as_completed(future_to_item):
             processed_count += 1
-            
-            # 진행 상황 JSON 출력
-            progress_percent = round((processed_count / initial_item_count) * 100, 2) 
-            sys.stdout.write(json.dumps({
-                "mode": "progress",
-                "total_symbols": initial_item_count,
-                "processed_symbols": processed_count,
-                "progress_percent": progress_percent
-            }, ensure_ascii=False, cls=CustomJsonEncoder, indent=None, separators=(',', ':')) + "\n")
-            sys.stdout.flush()
+
+            # 진행 상황 JSON 출력 (마지막 종목은 항상 출력하여 100%를 보장)
+            if processed_count == initial_item_count or processed_count % progress_step == 0:
+                progress_percent = round((processed_count / initial_item_count) * 100, 2)
+                sys.stdout.write(_json_dumps_bytes({
+                    "mode": "progress",
+                    "total_symbols": initial_item_count,
+                    "processed_symbols": processed_count,
+                    "progress_percent": progress_percent
+                }).decode('utf-8') + "\n")
+                sys.stdout.flush()
 
             try:
                 r = future.result()
@@ -539,7 +767,7 @@ def run_analysis(workers, ma_periods_str, analyze_patterns_flag, pattern_type_fi
             except Exception as e:
                 code = future_to_item[future].get("Code") or future_to_item[future].get("code")
                 name = future_to_item[future].get("Name") or future_to_item[future].get("name")
-                logging.error(f"[ERROR] {code} {name} 처리 중 예외 발생: {e}")
+                logging.error("[ERROR] %s %s 처리 중 예외 발생: %s", code, name, e, exc_info=True)
 
     # 결과 정렬 및 상위 N개 선택
     results.sort(key=lambda x: x.get('sort_score', -1), reverse=True)
@@ -569,8 +797,8 @@ def run_analysis(workers, ma_periods_str, analyze_patterns_flag, pattern_type_fi
     
     if not symbol_filter:
         try:
-            with open(cache_path, 'w', encoding='utf-8') as f:
-                json.dump(final_output, f, ensure_ascii=False, cls=CustomJsonEncoder, indent=None, separators=(',', ':'))
+            with open(cache_path, 'wb') as f:
+                f.write(_json_dumps_bytes(final_output))
             logging.info(f"분석 결과 캐시 저장 완료: {cache_key}")
         except Exception as e:
             logging.error(f"캐시 파일 저장 실패: {e}")
@@ -599,8 +827,8 @@ def generate_chart(symbol, ma_periods_str, chart_period):
         return
 
     try:
-        df = pd.read_parquet(path)
-        
+        df = _read_raw_parquet(path)
+
         if df.index.dtype != 'datetime64[ns]' and 'Date' in df.columns:
             df = df.set_index('Date')
             
@@ -609,19 +837,30 @@ def generate_chart(symbol, ma_periods_str, chart_period):
             return
 
         df_full = calculate_advanced_features(df)
-        df_for_chart = df_full.iloc[-chart_period:].copy()
+        # 패턴 탐지는 분석 모드와 동일한 250일 창을 보장해야 하므로
+        # 차트 구간이 더 짧아도 탐지용 프레임은 최소 250일을 유지
+        df_detect = df_full.iloc[-max(chart_period, 250):].copy()
+        df_for_chart = df_detect.iloc[-chart_period:].copy()
+        # 전체 기간 프레임은 즉시 해제 (이후 로직은 탐지/차트 프레임만 사용)
+        del df_full, df
 
         if df_for_chart.empty:
             safe_print_json({"error": "특징 계산 후 데이터가 부족하여 차트 생성 불가."}, status_code=1)
             return
 
+        # 날짜 문자열은 1회만 벡터 변환하여 모든 구간 포맷팅에서 공유
+        date_strs = df_for_chart.index.strftime('%Y-%m-%d').to_numpy()
+
         # 1. 캔들스틱 데이터 포맷팅 (OHLCV)
-        ohlcv_data = []
-        for index, row in df_for_chart.iterrows():
-            ohlcv_data.append({
-                "x": index.strftime('%Y-%m-%d'), 
-                "o": row['Open'], "h": row['High'], "l": row['Low'], "c": row['Close'], "v": row['Volume']
-            })
+        # iterrows()의 행별 Series 생성 비용을 피하고 ndarray zip으로 일괄 구성
+        ohlcv_data = [
+            {"x": x, "o": o, "h": h, "l": l, "c": c, "v": v}
+            for x, o, h, l, c, v in zip(
+                date_strs,
+                df_for_chart['Open'].to_numpy(), df_for_chart['High'].to_numpy(),
+                df_for_chart['Low'].to_numpy(), df_for_chart['Close'].to_numpy(),
+                df_for_chart['Volume'].to_numpy())
+        ]
 
         # 2. 이동평균선(MA) 데이터 포맷팅
         ma_data = {}
@@ -629,24 +868,20 @@ def generate_chart(symbol, ma_periods_str, chart_period):
             ma_col_name = f'SMA_{p}'
             if ma_col_name not in df_for_chart.columns:
                  # 없는 MA를 다시 계산 (Parquet에 저장되지 않은 경우 대비)
-                 df_for_chart[ma_col_name] = df_for_chart['Close'].rolling(window=p, min_periods=1).mean() 
+                 df_for_chart[ma_col_name] = df_for_chart['Close'].rolling(window=p, min_periods=1).mean()
 
-            ma_values = []
-            for index, row in df_for_chart.iterrows():
-                if not pd.isna(row[ma_col_name]):
-                    ma_values.append({"x": index.strftime('%Y-%m-%d'), "y": row[ma_col_name]})
-            ma_data[f"MA{p}"] = ma_values
-        
-        # 3. MACD 데이터 포맷팅
-        macd_data = {"MACD": [], "Signal": [], "Histogram": []}
-        for index, row in df_for_chart.iterrows():
-            date_str = index.strftime('%Y-%m-%d')
-            if not pd.isna(row['MACD']):
-                macd_data["MACD"].append({"x": date_str, "y": row['MACD']})
-            if not pd.isna(row['MACD_Signal']):
-                macd_data["Signal"].append({"x": date_str, "y": row['MACD_Signal']})
-            if not pd.isna(row['MACD_Hist']):
-                macd_data["Histogram"].append({"x": date_str, "y": row['MACD_Hist']})
+            ma_vals = df_for_chart[ma_col_name].to_numpy()
+            ma_data[f"MA{p}"] = [
+                {"x": x, "y": y} for x, y in zip(date_strs, ma_vals) if not np.isnan(y)
+            ]
+
+        # 3. MACD 데이터 포맷팅 (NaN 마스크 기반 일괄 구성)
+        macd_data = {}
+        for key, col in (("MACD", 'MACD'), ("Signal", 'MACD_Signal'), ("Histogram", 'MACD_Hist')):
+            vals = df_for_chart[col].to_numpy()
+            macd_data[key] = [
+                {"x": x, "y": y} for x, y in zip(date_strs, vals) if not np.isnan(y)
+            ]
 
         # 4. 크로스 지점 감지 및 패턴 넥라인 정보 추가
         cross_data = []
@@ -655,32 +890,39 @@ def generate_chart(symbol, ma_periods_str, chart_period):
         ma50_col = 'SMA_50'
         ma200_col = 'SMA_200'
         
-        # 4-1. MA 크로스 지점 감지
+        # 4-1. MA 크로스 지점 감지 (라벨 기반 .loc 조회 대신 np.diff로 부호 전환을 일괄 검출)
         if ma50_col in df_for_chart.columns and ma200_col in df_for_chart.columns:
-            ma_cross = df_for_chart[ma50_col] > df_for_chart[ma200_col]
-            cross_points = ma_cross[ma_cross != ma_cross.shift(1)]
-
-            for date, is_above in cross_points.items():
-                if date == df_for_chart.index[0]: continue
-                prev_above = ma_cross.shift(1).loc[date]
-                cross_type = ""
-                
-                if not prev_above and is_above: cross_type = "GoldenCross"
-                elif prev_above and not is_above: cross_type = "DeadCross"
-                
-                if cross_type:
-                    cross_data.append({"x": date.strftime('%Y-%m-%d'), "y": df_for_chart.loc[date, 'Close'], "type": cross_type})
-
-        # 4-2. 패턴 넥라인 정보 감지
-        peaks_all, troughs_all = find_peaks_and_troughs(df_full)
-        
-        _, db_neckline, db_status, _ = find_double_bottom(df_full, troughs_all)
-        _, tb_neckline, tb_status, _ = find_triple_bottom(df_full, troughs_all)
-        _, ch_neckline, ch_status, _ = find_cup_and_handle(df_full, peaks_all, troughs_all)
-
-        today_date = df_full.index[-1].strftime('%Y-%m-%d')
-        chart_min_close = df_for_chart['Close'].min()
-        chart_max_close = df_for_chart['Close'].max()
+            above = df_for_chart[ma50_col].to_numpy() > df_for_chart[ma200_col].to_numpy()
+            diff = np.diff(above.view(np.int8))
+            golden_idx = np.flatnonzero(diff == 1) + 1
+            dead_idx = np.flatnonzero(diff == -1) + 1
+
+            closes = df_for_chart['Close'].to_numpy()
+            cross_data.extend(
+                {"x": date_strs[i], "y": float(closes[i]), "type": "GoldenCross"} for i in golden_idx)
+            cross_data.extend(
+                {"x": date_strs[i], "y": float(closes[i]), "type": "DeadCross"} for i in dead_idx)
+            # 기존과 동일하게 시간순 정렬 유지
+            cross_data.sort(key=lambda d: d["x"])
+
+        # 4-2. 패턴 넥라인 정보 감지 (탐지 프레임은 차트 구간과 무관하게 250일 창 보장)
+        peaks_all, troughs_all = find_peaks_and_troughs(df_detect)
+
+        close_all = df_detect['Close'].to_numpy(dtype=np.float64, copy=False)
+        threshold = len(df_detect) - 250
+        recent_troughs_all = troughs_all[np.searchsorted(troughs_all, threshold):]
+        recent_peaks_all = peaks_all[np.searchsorted(peaks_all, threshold):]
+        current_price = close_all[-1]
+
+        _, db_neckline, db_status, _ = find_double_bottom(close_all, recent_troughs_all, current_price)
+        _, tb_neckline, tb_status, _ = find_triple_bottom(close_all, recent_troughs_all, current_price)
+        _, ch_neckline, ch_status, _ = find_cup_and_handle(close_all, recent_peaks_all, current_price)
+
+        today_date = date_strs[-1]
+        # 넥라인 표시 범위는 실제 차트에 그려지는 구간의 종가 범위를 기준으로 판단
+        chart_closes = df_for_chart['Close'].to_numpy()
+        chart_min_close = chart_closes.min()
+        chart_max_close = chart_closes.max()
 
         patterns_to_check = [
             ("DoubleBottom", db_neckline, db_status),
@@ -709,7 +951,7 @@ def generate_chart(symbol, ma_periods_str, chart_period):
         safe_print_json(final_output, status_code=0)
 
     except Exception as e:
-        logging.error(f"[ERROR] Chart.js 데이터 생성 실패 ({code} {name}): {e}\n{traceback.format_exc()}")
+        logging.error("[ERROR] Chart.js 데이터 생성 실패 (%s %s): %s", code, name, e, exc_info=True)
         safe_print_json({"error": f"Chart.js 데이터 생성 실패: {e}"}, status_code=1)
 
 
@@ -720,7 +962,7 @@ def main():
     
     # 요청하신 인자 목록 반영
     parser.add_argument("--mode", type=str, required=True, choices=['analyze', 'chart'], help="실행 모드 선택: 'analyze' 또는 'chart'")
-    parser.add_argument("--workers", type=int, default=os.cpu_count() * 2, help="분석 모드에서 사용할 최대 스레드 수")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="분석 모드에서 사용할 최대 프로세스 수")
     parser.add_argument("--ma_periods", type=str, default="20,50,200", help="이동 평균선 기간 지정 (쉼표로 구분, 예: 5,20,50)")
     parser.add_argument("--chart_period", type=int, default=250, help="차트 모드에서 표시할 거래일 수 (기본값: 250일)")
     
@@ -739,8 +981,12 @@ def main():
     
     # 로깅 레벨 설정
     log_level = logging.DEBUG if args.debug else logging.INFO
-    setup_env(log_level=log_level) 
-    
+    setup_env(log_level=log_level)
+
+    # 인터넷 연결 확인은 main()에서만 수행 (spawn 워커의 모듈 재임포트 시 중복 실행 방지)
+    if not check_internet_connection():
+        safe_print_json({"error": "CRITICAL_ERROR", "reason": "인터넷 연결을 확인할 수 없습니다.", "mode": "initial_check"})
+
     if args.mode == 'analyze':
         # analyze_patterns 플래그가 설정되었거나, pattern_type이 MA/Regime 필터가 아닌 경우 패턴 분석 활성화
         analyze_patterns_flag = args.analyze_patterns or (args.pattern_type not in [None, 'ma', 'all_below_ma'] and not (args.pattern_type and args.pattern_type.startswith('regime:')))
@@ -19,15 +19,42 @@ import sys
 import json
 import logging
 import argparse
+import asyncio
+import functools
+import numpy as np
 import pandas as pd
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
 import FinanceDataReader as fdr
 import matplotlib.pyplot as plt
 import matplotlib.font_manager as fm
 import mplfinance as mpf
-import io, base64, traceback
+import io, base64, hashlib, traceback
 from datetime import datetime, timedelta
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# 고속 JSON 직렬화용 (미설치 시 표준 json 폴백)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ModuleNotFoundError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+# 비동기 프리페치용 (미설치 시 기존 fdr 폴백 경로 사용)
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ModuleNotFoundError:
+    HTTPX_AVAILABLE = False
+
+# 연속 하락 커널 JIT 컴파일용 (미설치 시 numpy 벡터 구현 사용)
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ModuleNotFoundError:
+    NUMBA_AVAILABLE = False
 
 
 # =====================================================
@@ -36,6 +63,9 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 
 BASE_DIR = Path(__file__).resolve().parents[2]
 DATA_DIR = BASE_DIR / "data" / "stock_data"
+BY_CODE_DIR = DATA_DIR / "by_code"  # 파티션 데이터셋 (code=XXXXXX/...)
+CHART_CACHE_DIR = DATA_DIR / "chart_cache"  # 렌더링된 차트 base64 캐시
+PREFETCH_DIR = DATA_DIR / "scan_prefetch"  # 스캐너 전용 종가 프리페치 (OHLCV 본 저장소와 분리)
 LIST_FILE = BASE_DIR / "data" / "stock_list" / "stock_listing.json"
 LOG_DIR = BASE_DIR / "log"
 LOG_FILE = LOG_DIR / "find_last_close_downward.log"
@@ -91,7 +121,12 @@ sys.stdout = open(os.devnull, "w")
 
 
 def safe_print_json(data):
-    sys.__stdout__.write(json.dumps(data, ensure_ascii=False, indent=2) + "\n")
+    # orjson은 UTF-8 bytes를 바로 생성하므로 인코딩 단계 없이 buffer에 기록
+    # (차트 base64처럼 수 MB짜리 페이로드에서 직렬화 시간이 크게 줄어듦)
+    if ORJSON_AVAILABLE:
+        sys.__stdout__.buffer.write(orjson.dumps(data, option=orjson.OPT_INDENT_2) + b"\n")
+    else:
+        sys.__stdout__.write(json.dumps(data, ensure_ascii=False, indent=2) + "\n")
     sys.__stdout__.flush()
 
 
@@ -99,9 +134,23 @@ def safe_print_json(data):
 # 📊 유틸 함수
 # =====================================================
 
+@functools.lru_cache(maxsize=1)
 def load_listing():
+    # 동일 프로세스 내 반복 호출(get_stock_name 등)은 파일 재파싱 없이 캐시 사용
+    # Arrow IPC 사본이 있으면 JSON 파싱 없이 Code/Name 컬럼만 메모리 매핑해 읽음
+    # (update_stock_listing이 목록 갱신 시 함께 기록하지만 prod 갱신기는 JSON만
+    #  다시 쓰므로, 사본이 JSON보다 오래됐으면 최신 목록인 JSON으로 폴백)
+    feather_file = LIST_FILE.with_suffix(".feather")
+    if feather_file.exists() and (
+        not LIST_FILE.exists()
+        or feather_file.stat().st_mtime >= LIST_FILE.stat().st_mtime
+    ):
+        cols = feather.read_table(feather_file, memory_map=True).to_pydict()
+        return [{"Code": c, "Name": n} for c, n in zip(cols["Code"], cols["Name"])]
     if not LIST_FILE.exists():
         raise FileNotFoundError(f"종목 리스트 파일 없음: {LIST_FILE}")
+    if ORJSON_AVAILABLE:
+        return orjson.loads(LIST_FILE.read_bytes())
     with open(LIST_FILE, "r", encoding="utf-8") as f:
         return json.load(f)
 
@@ -118,17 +167,243 @@ def get_stock_name(symbol):
         return symbol
 
 
-def count_consecutive_down(df):
-    close = df["Close"].tolist()
-    cnt = 0
+@functools.lru_cache(maxsize=4096)
+def load_close_frame(code):
+    """종가 프레임을 로드합니다. 파티션 데이터셋이 있으면 우선 사용합니다.
+
+    LRU 캐시: 같은 프로세스에서 여러 날짜 구간을 스캔할 때 2회차부터는
+    parquet 디코딩 없이 메모리의 프레임을 그대로 반환합니다.
+    (읽기 전용으로만 사용할 것 — 날짜 필터는 호출부에서 복사본을 만듦)
+
+    수천 개의 개별 parquet 파일을 매 실행마다 열지 않고, 단일 데이터셋의
+    파티션 프루닝(code=... 디렉토리)으로 해당 종목 데이터만 읽습니다.
+    데이터셋이 없거나 해당 종목이 없으면 기존 개별 파일로 대체합니다.
+    """
+    if BY_CODE_DIR.exists():
+        try:
+            # Date 컬럼을 함께 읽어 인덱스로 복원해야 호출부의 날짜 이진 탐색이 동작함
+            # (Close만 투영하면 RangeIndex가 되어 모든 종목이 구간 밖으로 빠짐)
+            df = pd.read_parquet(
+                BY_CODE_DIR, columns=["Date", "Close"],
+                filters=[("code", "=", code)], memory_map=True,
+            )
+            if not df.empty:
+                df = df.set_index("Date")
+                if df.index.dtype != 'datetime64[ns]':
+                    df.index = pd.to_datetime(df.index)
+                # 연속 하락 비교는 float32 정밀도로 충분 (요소당 바이트 절반)
+                df["Close"] = df["Close"].astype(np.float32, copy=False)
+                return df
+        except Exception as e:
+            logging.warning(f"[{code}] 파티션 데이터셋 읽기 실패, 개별 파일로 대체: {e}")
 
-    for i in range(len(close) - 1, 0, -1):
-        if close[i] < close[i - 1]:
-            cnt += 1
-        else:
-            break
+    path = DATA_DIR / f"{code}.parquet"
+    if path.exists():
+        # 분석에는 Close만 필요 — 컬럼 투영 + memory_map으로 I/O와 디코딩을 최소화.
+        # 인덱스 컬럼(Date 또는 기본 인덱스)은 스키마에서 찾아 함께 읽어야
+        # to_pandas가 DatetimeIndex를 복원하고 날짜 필터가 그대로 동작함.
+        names = pq.ParquetFile(path).schema_arrow.names
+        wanted = [c for c in names if c in ("Date", "Close", "__index_level_0__")]
+        tbl = pq.read_table(path, columns=wanted, memory_map=True)
+        # self_destruct + split_blocks: Arrow 버퍼를 pandas가 그대로 넘겨받아
+        # 변환 중 복사본을 만들지 않음 (읽기당 RSS 절반)
+        df = tbl.to_pandas(self_destruct=True, split_blocks=True)
+        del tbl
+        # Date가 인덱스 메타데이터 없이 일반 컬럼으로 저장된 파일(프로덕션 갱신기의
+        # preserve_index=False 출력 등)은 여기서 직접 인덱스로 승격시켜야 함
+        if "Date" in df.columns:
+            df = df.set_index("Date")
+        if df.index.dtype != 'datetime64[ns]':
+            df.index = pd.to_datetime(df.index)
+        df["Close"] = df["Close"].astype(np.float32, copy=False)
+        return df
+
+    # 정식 저장소에 없으면 스캐너 전용 프리페치 사본(Close 단일 컬럼)으로 대체
+    pre_path = PREFETCH_DIR / f"{code}.parquet"
+    if pre_path.exists():
+        df = pd.read_parquet(pre_path, memory_map=True)
+        if "Date" in df.columns:
+            df = df.set_index("Date")
+        if df.index.dtype != 'datetime64[ns]':
+            df.index = pd.to_datetime(df.index)
+        df["Close"] = df["Close"].astype(np.float32, copy=False)
+        return df
+    return None
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True, fastmath=True)
+    def _count_down_jit(closes):
+        cnt = 0
+        for i in range(closes.size - 1, 0, -1):
+            if closes[i] < closes[i - 1]:
+                cnt += 1
+            else:
+                break
+        return cnt
+
+    # 워커의 첫 호출이 컴파일 비용을 물지 않도록 임포트 시점에 예열
+    _count_down_jit(np.zeros(2, dtype=np.float32))
+
+
+def prunable_by_stats(path, start_date, end_date):
+    """로우그룹 통계(min/max)만 보고 읽을 가치가 없는 파일을 선별합니다.
+
+    데이터 페이지를 디코딩하지 않고 푸터 메타데이터만 읽으므로 비용은 O(KB).
+    - 마지막 로우그룹의 최대 날짜가 분석 윈도우 시작 이전이면 윈도우가 비므로 스킵
+    - 마지막 로우그룹의 종가 min == max (변동 없음)이면 연속 하락이 불가하므로 스킵
+      (단, 조회 구간이 마지막 로우그룹 전체를 덮을 때만 — --end_date로 과거
+      구간을 조회하면 꼬리가 평탄해도 구간 끝에는 진짜 하락이 있을 수 있음)
+    판단이 불확실하면 False를 반환해 정상 경로로 읽는다.
+    """
+    try:
+        pf = pq.ParquetFile(path)
+        meta = pf.metadata
+        names = pf.schema_arrow.names
+        last_rg = meta.row_group(meta.num_row_groups - 1)
+
+        last_rg_max_date = None
+        for i, name in enumerate(names):
+            if name in ("Date", "__index_level_0__"):
+                stats = last_rg.column(i).statistics
+                if stats is not None and stats.has_min_max:
+                    if pd.Timestamp(stats.max) < pd.Timestamp(start_date):
+                        return True
+                    last_rg_max_date = pd.Timestamp(stats.max)
+                break
+
+        # 평탄 꼬리(min == max, 4행 이상)가 조회 구간 끝에 통째로 포함될 때만
+        # 연속 하락 불가가 보장됨 (구간이 꼬리 일부만 덮으면 판정 불가)
+        if (last_rg_max_date is not None
+                and pd.Timestamp(end_date) >= last_rg_max_date
+                and "Close" in names):
+            stats = last_rg.column(names.index("Close")).statistics
+            if (stats is not None and stats.has_min_max
+                    and stats.min == stats.max and last_rg.num_rows >= 4):
+                return True
+        return False
+    except Exception:
+        return False
+
+
+def count_consecutive_down(closes):
+    """마지막 종가 기준 연속 하락일 수를 계산합니다.
+
+    인자는 날짜 오름차순으로 정렬된 종가 ndarray (SoA 형태, float32 권장).
+    numba가 있으면 네이티브 꼬리 루프(조기 종료), 없으면 numpy 벡터 연산 사용.
+    """
+    if closes.size < 2:
+        return 0
+
+    if NUMBA_AVAILABLE:
+        return int(_count_down_jit(closes))
 
-    return cnt
+    # 전일 대비 하락 여부를 한 번에 계산한 뒤, 뒤에서부터 이어지는 True 구간 길이를 구함
+    down = closes[1:] < closes[:-1]
+    rev = down[::-1]
+    if rev.all():
+        return int(rev.size)
+    # 뒤집은 배열에서 첫 False 위치 = 꼬리 연속 하락일 수
+    return int(np.argmax(~rev))
+
+
+# =====================================================
+# 🌐 비동기 프리페치 (캐시 미보유 종목 일괄 다운로드)
+# =====================================================
+
+YAHOO_SPARK_URL = "https://query1.finance.yahoo.com/v8/finance/spark"
+PREFETCH_CONCURRENCY = 64
+PREFETCH_BATCH_SIZE = 20 # 야후 spark 엔드포인트가 허용하는 URL당 최대 심볼 수
+
+
+def _yahoo_ticker(code, suffix=".KS"):
+    """KRX 종목 코드를 야후 티커 형식으로 변환합니다."""
+    return code if "." in code else f"{code}{suffix}"
+
+
+def _prefetch_is_fresh(code):
+    """오늘 받은 프리페치 사본이 있는지 확인합니다 (전일 사본은 재다운로드 대상)."""
+    p = PREFETCH_DIR / f"{code}.parquet"
+    try:
+        return p.exists() and datetime.fromtimestamp(p.stat().st_mtime).date() == datetime.now().date()
+    except OSError:
+        return False
+
+
+async def _prefetch_batch(client, sem, codes, suffix=".KS"):
+    """한 번의 HTTP 호출로 최대 20개 종목을 받아 스캐너 전용 디렉토리에 저장합니다.
+
+    spark 응답은 종가만 제공하므로 결과를 OHLCV 본 저장소(DATA_DIR)에 섞지 않고
+    PREFETCH_DIR에 격리합니다 — 본 저장소에 Close 단일 컬럼 파일이 생기면 차트
+    모드와 갱신기의 증분 병합(스키마 불일치)이 깨집니다. 전체 OHLCV는
+    update_stock_listing 실행 시 정식으로 채워집니다.
+    """
+    by_ticker = {_yahoo_ticker(c, suffix): c for c in codes}
+    async with sem:
+        try:
+            resp = await client.get(
+                YAHOO_SPARK_URL,
+                params={"symbols": ",".join(by_ticker), "range": "1y", "interval": "1d"},
+            )
+            resp.raise_for_status()
+            payload = resp.json()
+        except Exception as e:
+            logging.error(f"[ERROR] 프리페치 배치 실패 ({codes[0]} 외 {len(codes) - 1}개): {e}")
+            return
+
+    for result in payload.get("spark", {}).get("result", []):
+        ticker = result.get("symbol")
+        try:
+            code = by_ticker.get(ticker)
+            res = result["response"][0]
+            ts = res["timestamp"]
+            close = res["indicators"]["quote"][0]["close"]
+            df = pd.DataFrame({"Close": close}, index=pd.to_datetime(ts, unit="s").normalize())
+            df.index.name = "Date"
+            df = df.dropna()
+            if code and not df.empty:
+                df.to_parquet(PREFETCH_DIR / f"{code}.parquet")
+        except Exception as e:
+            logging.error(f"[ERROR] {ticker} 프리페치 응답 파싱 실패: {e}")
+
+
+async def _prefetch_async(codes):
+    sem = asyncio.Semaphore(PREFETCH_CONCURRENCY)
+    limits = httpx.Limits(max_keepalive_connections=64, max_connections=128)
+    headers = {"User-Agent": "Mozilla/5.0"}
+    batches = [codes[i:i + PREFETCH_BATCH_SIZE] for i in range(0, len(codes), PREFETCH_BATCH_SIZE)]
+    async with httpx.AsyncClient(limits=limits, timeout=10.0, headers=headers) as client:
+        await asyncio.gather(*(_prefetch_batch(client, sem, batch, ".KS") for batch in batches))
+        # 목록에는 시장 구분이 없어 코스피(.KS)로 못 받은 종목은 코스닥(.KQ) 티커로 재시도
+        remaining = [c for c in codes if not _prefetch_is_fresh(c)]
+        if remaining:
+            retry_batches = [remaining[i:i + PREFETCH_BATCH_SIZE]
+                             for i in range(0, len(remaining), PREFETCH_BATCH_SIZE)]
+            await asyncio.gather(*(_prefetch_batch(client, sem, batch, ".KQ") for batch in retry_batches))
+
+
+def prefetch_missing(items):
+    """parquet 캐시가 없는 종목을 keep-alive 커넥션 풀 하나로 동시 다운로드합니다.
+
+    스레드마다 fdr.DataReader가 커넥션을 새로 맺는 대신 단일 클라이언트로
+    요청을 몰아서 콜드 스캔의 네트워크 구간을 단축합니다.
+    httpx 미설치 시에는 아무것도 하지 않고 기존 fdr 폴백 경로를 사용합니다.
+    """
+    if not HTTPX_AVAILABLE:
+        return
+    codes = [item.get("Code") or item.get("code") for item in items]
+    missing = [
+        c for c in codes
+        if c and not (DATA_DIR / f"{c}.parquet").exists()
+        and not (BY_CODE_DIR / f"code={c}").exists()
+        and not _prefetch_is_fresh(c)
+    ]
+    if not missing:
+        return
+    PREFETCH_DIR.mkdir(parents=True, exist_ok=True)
+    logging.info(f"[LOG] 캐시 미보유 {len(missing)}개 종목 비동기 프리페치 시작")
+    asyncio.run(_prefetch_async(missing))
+    logging.info("[LOG] 비동기 프리페치 완료")
 
 
 # =====================================================
@@ -143,7 +418,18 @@ def generate_chart(symbol, start_date=None, end_date=None):
         if df is None or df.empty:
             safe_print_json({"error": f"{stock_name} ({symbol}) 데이터 없음"})
             return
-        
+
+        # 동일한 (종목, 구간, 최종 거래일) 조합은 렌더링 없이 캐시에서 재사용
+        # (matplotlib 렌더링 + PNG 인코딩이 차트 응답 시간의 대부분을 차지)
+        cache_key = hashlib.blake2b(
+            f"{symbol}|{start_date}|{end_date}|{df.index.max()}".encode(),
+            digest_size=16
+        ).hexdigest()
+        cache_path = CHART_CACHE_DIR / f"{cache_key}.b64"
+        if cache_path.exists():
+            safe_print_json({"image_data": cache_path.read_text()})
+            sys.exit(0)
+
         mc = mpf.make_marketcolors(
             up='red',
             down='blue',
@@ -203,6 +489,12 @@ def generate_chart(symbol, start_date=None, end_date=None):
         buf.close()
         plt.close(fig)
 
+        # 다음 호출을 위해 캐시에 저장 (임시 파일 후 원자적 교체)
+        CHART_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_suffix(".tmp")
+        tmp_path.write_text(b64)
+        os.replace(tmp_path, cache_path)
+
         safe_print_json({"image_data": b64})
         sys.exit(0)
 
@@ -222,17 +514,34 @@ def analyze_symbol(item, start_date, end_date):
     path = DATA_DIR / f"{code}.parquet"
 
     try:
-        if path.exists():
-            df = pd.read_parquet(path)
-        else:
-            df = fdr.DataReader(code)
-            df.to_parquet(path)
+        # 다운로드는 사전 프리페치 단계(prefetch_missing)가 전담하므로
+        # 풀 워커는 네트워크를 타지 않는 순수 CPU 작업만 수행
+        # (캐시 미보유 종목은 이번 실행에서는 건너뛰고 다음 갱신 때 포함됨)
 
-        df = df.loc[(df.index >= start_date) & (df.index <= end_date)]
-        if df.empty:
+        # 통계 선별: 윈도우와 겹치지 않거나 변동 없는 종목은 본문 읽기 없이 제외
+        if path.exists() and prunable_by_stats(path, start_date, end_date):
             return None
 
-        d = count_consecutive_down(df)
+        df = load_close_frame(code)
+        if df is None:
+            return None
+
+        # 날짜 구간은 정렬된 DatetimeIndex에 대한 이진 탐색으로 절단
+        # (불리언 마스크는 전체 인덱스를 두 번 비교·복사하므로 O(n) 할당 발생)
+        ts = df.index.view("i8")
+        lo = int(np.searchsorted(ts, pd.Timestamp(start_date).value, side="left"))
+        hi = int(np.searchsorted(ts, pd.Timestamp(end_date).value, side="right"))
+        if lo >= hi:
+            return None
+
+        closes = df["Close"].to_numpy(copy=False)[lo:hi]
+
+        # 임계값(3일) 전용 조기 탈락: 꼬리 4개 종가 비교 세 번이면
+        # 대부분의 종목이 전체 스캔 없이 걸러진다 (d < 3 결과는 어차피 버려짐)
+        if closes.size < 4 or not (closes[-1] < closes[-2] < closes[-3] < closes[-4]):
+            return None
+
+        d = count_consecutive_down(closes)
         if d >= 3:
             return {"ticker": code, "name": name, "streak": d}
 
@@ -254,11 +563,16 @@ def run_analysis(start_date, end_date, topN, workers):
         total = len(items)
         logging.info(f"[LOG] 종목 수: {total}")
 
+        # 캐시에 없는 종목은 분석 전에 비동기로 일괄 다운로드
+        prefetch_missing(items)
+
         results = []
         done = 0
         last_p = 0
 
-        with ThreadPoolExecutor(max_workers=workers) as ex:
+        # 프리페치 후의 스캔은 parquet 디코딩 중심의 CPU 바운드 작업이므로
+        # GIL에 묶이는 스레드 대신 프로세스 풀을 사용 (코어 수만큼 병렬화)
+        with ProcessPoolExecutor(max_workers=min(workers, os.cpu_count() or 1)) as ex:
             futs = [ex.submit(analyze_symbol, i, start_date, end_date) for i in items]
 
             for f in as_completed(futs):
@@ -21,7 +21,10 @@ import os
 import sys
 import json
 import time
+import queue
+import atexit
 import logging
+import logging.handlers
 import argparse
 from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError
 from pathlib import Path
@@ -33,6 +36,9 @@ from datetime import datetime
 try:
     import FinanceDataReader as fdr
     import pandas as pd
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
 except ModuleNotFoundError as e:
     # 🧱 Python 환경에 필요한 라이브러리가 설치되지 않음
     print(json.dumps({"error": f"필수 모듈 누락: {e.name} 설치 필요"}, ensure_ascii=False))
@@ -57,21 +63,54 @@ LOG_FILE = LOG_DIR / "update_stock_listing.log"
 def setup_env():
     """
     폴더가 없으면 자동 생성하고, 로깅 설정을 초기화한다.
+    워커 스레드가 파일/콘솔 I/O 락에 묶이지 않도록 QueueHandler로 비동기화한다.
     """
     LOG_DIR.mkdir(parents=True, exist_ok=True)
     DATA_DIR.mkdir(parents=True, exist_ok=True)
     LISTING_FILE.parent.mkdir(parents=True, exist_ok=True)
 
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(levelname)s - %(message)s",
-        handlers=[
-            # 로그를 파일에도 저장
-            logging.FileHandler(LOG_FILE, encoding="utf-8"),
-            # 콘솔에도 동시에 출력 (Spring Boot SSE에서 수신)
-            logging.StreamHandler(sys.stdout)
-        ]
-    )
+    formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+
+    # 로그를 파일에도 저장
+    file_handler = logging.FileHandler(LOG_FILE, encoding="utf-8")
+    file_handler.setFormatter(formatter)
+    # 콘솔에도 동시에 출력 (Spring Boot SSE에서 수신)
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(formatter)
+
+    # 워커는 큐에 레코드만 넣고, 실제 I/O는 리스너 스레드가 전담
+    log_queue = queue.Queue(-1)
+    listener = logging.handlers.QueueListener(log_queue, file_handler, stream_handler)
+    listener.start()
+    atexit.register(listener.stop)
+
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+
+
+def install_shared_http_session():
+    """
+    fdr 내부의 모듈 레벨 requests 호출이 커넥션 풀을 재사용하도록 설정한다.
+    requests.get은 호출마다 새 Session(새 TCP+TLS 핸드셰이크)을 만들기 때문에
+    종목당 왕복 비용이 고정으로 붙는다. 공유 Session + 넉넉한 풀로 교체하면
+    모든 워커 스레드가 keep-alive 커넥션을 나눠 쓴다.
+    """
+    try:
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        sess = requests.Session()
+        adapter = HTTPAdapter(pool_connections=64, pool_maxsize=64)
+        sess.mount("https://", adapter)
+        sess.mount("http://", adapter)
+
+        requests.get = sess.get
+        requests.post = sess.post
+        requests.request = sess.request
+    except Exception as e:
+        # 세션 설정 실패는 성능 문제일 뿐이므로 기본 경로로 계속 진행
+        logging.warning(f"[LOG] 공유 HTTP 세션 설정 실패 (기본 경로 사용): {e}")
 
 
 # ==============================
@@ -108,6 +147,10 @@ def download_and_save_listing():
         krx.to_json(LISTING_FILE, orient="records", force_ascii=False, indent=2)
         logging.info(f"[LOG] KRX 종목 리스트 저장 완료: {LISTING_FILE}")
 
+        # 스캐너 기동용 Arrow IPC 사본 (Code/Name만): JSON 렉싱·행별 dict 생성 없이
+        # 바이트 단위로 메모리 매핑해 읽을 수 있어 기동 지연이 크게 줄어든다
+        feather.write_feather(krx[["Code", "Name"]], LISTING_FILE.with_suffix(".feather"))
+
         total = len(krx)
         logging.info(f"[KRX_TOTAL] {total}")
         logging.info(f"[KRX_SAVED] {total}")
@@ -140,8 +183,17 @@ def fetch_and_save_stock(symbol: str, name: str, force: bool = False):
         if df is None or df.empty:
             return f"{symbol} {name} → 데이터 없음", "no_data"
 
-        # parquet 저장
-        df.to_parquet(file_path)
+        # parquet 저장: ZSTD-1 압축 + 로우그룹 통계 기록
+        # (기본 snappy 대비 파일이 절반 수준으로 줄고, min/max 통계 덕분에
+        #  스캐너가 본문을 읽기 전에 로우그룹 단위로 건너뛸 수 있음)
+        pq.write_table(
+            pa.Table.from_pandas(df),
+            file_path,
+            compression="zstd",
+            compression_level=1,
+            write_statistics=True,
+            row_group_size=65536,
+        )
         return f"{symbol} {name} → 저장 완료", "success"
 
     except Exception as e:
@@ -158,7 +210,7 @@ def download_and_save_stocks(krx, workers: int, force: bool):
     ============================================================
     ✅ 개선된 특징
     ------------------------------------------------------------
-    1️⃣ 각 종목 처리 최대 10초 (응답 없으면 즉시 스킵)
+    1️⃣ 미완료 작업을 2×workers로 제한하는 유한 파이프라인 (RSS 상한 고정)
     2️⃣ 전체 병렬 다운로드 5분 제한 (남으면 전부 강제 취소)
     3️⃣ 진행률 2% 단위로 [PROGRESS] 로그 출력
     4️⃣ 중간 실패나 네트워크 오류도 전체 중단 없이 계속 진행
@@ -166,9 +218,10 @@ def download_and_save_stocks(krx, workers: int, force: bool):
     """
     import concurrent.futures
 
-    symbols = krx["Code"].astype(str).tolist()
-    names = krx["Name"].astype(str).tolist()
-    total_count = len(symbols)
+    # Code/Name을 한 번의 순회로 (sym, nm) 튜플 목록으로 구성
+    # (컬럼별 astype(str).tolist() 두 번은 object 변환을 중복 수행)
+    pairs = list(krx[["Code", "Name"]].astype(str).itertuples(index=False, name=None))
+    total_count = len(pairs)
 
     logging.info(f"[PROGRESS] 20.0 KRX 목록 {total_count}건 로드됨")
     if not force:
@@ -180,48 +233,80 @@ def download_and_save_stocks(krx, workers: int, force: bool):
     update_step = max(1, total_count // 50)  # 약 2% 단위로 로그 표시
     completed_count = 0
     failed_count = 0
+    cached_count = 0
+    success_count = 0
     start_time = time.time()
 
-    MAX_TOTAL_SECONDS = 300  # ✅ 전체 5분 제한 (300초)
-    PER_STOCK_TIMEOUT = 10   # ✅ 각 종목별 10초 제한
+    MAX_TOTAL_SECONDS = 300   # ✅ 전체 5분 제한 (300초)
+    WAIT_TICK_SECONDS = 10    # ✅ 완료 대기 주기 (전체 제한 검사를 위해 주기적으로 깨어남)
+    MAX_PENDING = workers * 2 # ✅ 제출 상한: 수천 개 Future를 한꺼번에 쌓지 않음
+
+    pending = {}  # future -> (sym, nm)
+    pair_iter = iter(pairs)
+    exhausted = False
+    timed_out = False
 
     with ThreadPoolExecutor(max_workers=workers) as executor:
-        futures = {
-            executor.submit(fetch_and_save_stock, sym, nm, force): (idx, sym, nm)
-            for idx, (sym, nm) in enumerate(zip(symbols, names))
-        }
-
-        try:
-            for future in concurrent.futures.as_completed(futures, timeout=MAX_TOTAL_SECONDS):
-                idx, sym, nm = futures[future]
+        while pending or not exhausted:
+            # ✅ 전체 시간 제한 검사
+            if time.time() - start_time > MAX_TOTAL_SECONDS:
+                timed_out = True
+                break
+
+            # ✅ 생산자: 미완료 작업이 상한에 닿을 때까지만 제출 (무한 큐 방지)
+            while not exhausted and len(pending) < MAX_PENDING:
+                try:
+                    sym, nm = next(pair_iter)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending[executor.submit(fetch_and_save_stock, sym, nm, force)] = (sym, nm)
+
+            if not pending:
+                break
+
+            # ✅ 소비자: 완료된 작업부터 즉시 처리 (제출과 진행률 로그가 교차됨)
+            done, _ = concurrent.futures.wait(
+                pending, timeout=WAIT_TICK_SECONDS,
+                return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in done:
+                sym, nm = pending.pop(future)
                 try:
-                    # ✅ 한 종목당 최대 10초 대기
-                    result_msg, result_type = future.result(timeout=PER_STOCK_TIMEOUT)
+                    result_msg, result_type = future.result()
 
                     if result_type == "failed":
                         failed_count += 1
+                    elif result_type == "cached":
+                        cached_count += 1
+                    elif result_type == "success":
+                        success_count += 1
                     completed_count += 1
 
-                    logging.info(f"[LOG] {result_msg} ({completed_count}/{total_count})")
+                    # 종목별 결과는 DEBUG에서만 기록 (건당 INFO 로그는 락 경합으로 워커를 직렬화함)
+                    if logging.getLogger().isEnabledFor(logging.DEBUG):
+                        logging.debug("[LOG] %s (%d/%d)", result_msg, completed_count, total_count)
 
-                    # 일정 단위마다 진행률 출력
+                    # 일정 단위(약 2%)마다 집계 결과를 한 줄로 출력 (포맷팅/락 비용 N→50회)
                     if (completed_count % update_step == 0) or (completed_count == total_count):
                         pct = 30.0 + (completed_count / total_count) * 70.0
-                        logging.info(f"[PROGRESS] {pct:.1f} 종목 저장 {completed_count}/{total_count}")
+                        logging.info(
+                            "[PROGRESS] %.1f 종목 저장 %d/%d (신규=%d 캐시=%d 실패=%d)",
+                            pct, completed_count, total_count,
+                            success_count, cached_count, failed_count
+                        )
 
-                except concurrent.futures.TimeoutError:
-                    failed_count += 1
-                    logging.error(f"[TIMEOUT] {sym} {nm} → 응답 없음 (10초 초과 스킵)")
                 except Exception as e:
                     failed_count += 1
+                    completed_count += 1
                     logging.error(f"[ERROR] {sym} {nm} → {e}")
 
-        except concurrent.futures.TimeoutError:
+        if pending:
             # ✅ 전체 5분 초과 시 아직 안 끝난 작업 강제 취소
-            remaining = [f for f in futures if not f.done()]
-            for f in remaining:
+            for f in pending:
                 f.cancel()
-            logging.error(f"[GLOBAL TIMEOUT] 전체 다운로드 제한(5분) 초과 — 남은 {len(remaining)}개 작업 취소")
+            if timed_out:
+                logging.error(f"[GLOBAL TIMEOUT] 전체 다운로드 제한(5분) 초과 — 남은 {len(pending)}개 작업 취소")
 
     return completed_count, failed_count, total_count
 
@@ -246,6 +331,7 @@ def main():
     # 실행 시작 로그
     start_time = time.time()
     setup_env()
+    install_shared_http_session()
     logging.info("[PROGRESS] 2.0 환경 점검 중...")
     logging.info(f"[LOG] 실행 시작 (force={args.force}, workers={args.workers})")
 
@@ -15,23 +15,50 @@ import os
 import sys
 import json
 import time
+import queue
+import atexit
+import asyncio
 import logging
+import logging.handlers
+import multiprocessing as mp
 import argparse
 import socket
+from functools import lru_cache
 from pathlib import Path
 from datetime import datetime, timedelta
 from typing import Dict, Any
+import numpy as np
 import pandas as pd
-from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed, TimeoutError
 
 try:
     import FinanceDataReader as fdr
     import requests
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
 except ModuleNotFoundError as e:
     # 한국어 메시지 출력
     print(json.dumps({"error": f"필수 모듈 누락: {e.name} 설치 필요"}, ensure_ascii=False), flush=True)
     sys.exit(1)
 
+# 비동기 일괄 프리페치용 (미설치 시 기존 스레드 경로만 사용)
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ModuleNotFoundError:
+    httpx = None
+    HTTPX_AVAILABLE = False
+
+# 고속 JSON 파싱용 (미설치 시 pandas 경로 사용)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ModuleNotFoundError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
 # ==============================
 # 상수 정의
 # ==============================
@@ -52,6 +79,7 @@ DEFAULT_HISTORY_YEARS = 3
 BASE_DIR = Path(__file__).resolve().parents[2]
 LOG_DIR = BASE_DIR / "log"
 DATA_DIR = BASE_DIR / "data" / "stock_data"
+BY_CODE_DIR = DATA_DIR / "by_code"  # 스캐너가 우선 읽는 hive 파티션 데이터셋 (code=XXXXXX)
 LISTING_FILE = BASE_DIR / "data" / "stock_list" / "stock_listing.json"
 LOG_FILE = LOG_DIR / "robust_stock_updater.log"
 
@@ -62,14 +90,23 @@ def setup_env():
     LOG_DIR.mkdir(parents=True, exist_ok=True)
     DATA_DIR.mkdir(parents=True, exist_ok=True)
     LISTING_FILE.parent.mkdir(parents=True, exist_ok=True)
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(levelname)s - %(message)s",
-        handlers=[
-            logging.FileHandler(LOG_FILE, encoding="utf-8"),
-            logging.StreamHandler(sys.stdout)
-        ]
-    )
+
+    # 워커는 큐에 레코드만 넣고 포맷팅/파일·콘솔 I/O는 리스너 스레드가 전담
+    # (핸들러 락 + strftime 포맷이 완료 콜백 루프를 직렬화하던 병목 제거)
+    formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+    file_handler = logging.FileHandler(LOG_FILE, encoding="utf-8")
+    file_handler.setFormatter(formatter)
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, file_handler, stream_handler)
+    listener.start()
+    atexit.register(listener.stop)
+
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
 setup_env()
 
 # ==============================
@@ -102,7 +139,13 @@ def load_krx_listing():
         # 🌟 개선 로직: 캐시 파일이 존재하고 유효 기간(KRX_LIST_CACHE_DAYS) 내에 있는지 확인
         if cache_age < KRX_LIST_CACHE_DAYS:
             try:
-                krx = pd.read_json(LISTING_FILE, orient="records")
+                # orjson(C 구현)으로 파싱 후 Arrow 경유로 DataFrame 구성:
+                # pd.read_json의 list[dict] 중간 단계 대비 할당량과 피크 RSS가 크게 줄어듦
+                if ORJSON_AVAILABLE:
+                    rows = orjson.loads(LISTING_FILE.read_bytes())
+                    krx = pa.Table.from_pylist(rows).to_pandas(self_destruct=True)
+                else:
+                    krx = pd.read_json(LISTING_FILE, orient="records")
                 if not krx.empty:
                     total = len(krx)
                     logging.info(f"[LOG] KRX 종목 목록 캐시 로드 ({total}개, 캐시 기간 {cache_age}일)")
@@ -133,29 +176,220 @@ def load_krx_listing():
         print(json.dumps({"status": "failed", "error": str(e)}), flush=True)
         sys.exit(1)
 
+# ==============================
+# parquet 기록 (Arrow 직접 경로)
+# ==============================
+def _normalize_date(table: "pa.Table") -> "pa.Table":
+    """Date 컬럼을 date32(4바이트)로 통일한다 — ns 타임스탬프(8바이트)의 절반.
+
+    일별 시세에 시각 정보는 불필요하며, 저장/병합 양쪽이 같은 타입을 쓰면
+    읽을 때마다 하던 pd.to_datetime 재코어션도 사라진다.
+    """
+    if "Date" in table.column_names:
+        idx = table.schema.get_field_index("Date")
+        if not pa.types.is_date32(table.schema.field(idx).type):
+            table = table.set_column(idx, "Date", pc.cast(table.column(idx), pa.date32()))
+    return table
+
+
+def write_parquet(data, path: Path, code: str = None):
+    """
+    pandas의 to_parquet 대신 Arrow 테이블로 직접 기록한다 (pa.Table 직접 전달 가능).
+    BlockManager 재통합 경로를 건너뛰어 저장 시 피크 메모리가 줄고,
+    ZSTD-1 + 로우그룹 통계는 형제 스크립트(update_stock_listing)와 동일한 포맷.
+    code가 주어지면 스캐너용 hive 파티션 데이터셋(code=XXXXXX)도 함께 갱신한다.
+    """
+    table = data if isinstance(data, pa.Table) else pa.Table.from_pandas(data, preserve_index=False)
+    table = _normalize_date(table)
+    # 메모리 버퍼에 인코딩한 뒤 write_bytes 한 번으로 내려쓴다: 로우그룹마다
+    # 작은 write 시스템콜을 반복하는 대신 파일당 open/write/close 각 1회
+    sink = pa.BufferOutputStream()
+    pq.write_table(
+        table,
+        sink,
+        compression="zstd",
+        compression_level=1,
+        write_statistics=True,
+        row_group_size=65536,
+    )
+    path.write_bytes(sink.getvalue())
+
+    if code is None:
+        return
+    try:
+        # 파티션 경로로도 기록: 스캐너가 파일 2800개 오픈 대신 데이터셋 하나를
+        # 컬럼 투영/파티션 필터로 읽을 수 있다 (find_last_close_downward 참조)
+        partitioned = table.append_column("code", pa.array([code] * len(table), pa.string()))
+        ds.write_dataset(
+            partitioned, BY_CODE_DIR, format="parquet",
+            partitioning=ds.partitioning(pa.schema([("code", pa.string())]), flavor="hive"),
+            existing_data_behavior="delete_matching",
+        )
+    except Exception as e:
+        # 파티션 사본 실패는 본 저장에 영향 없음 (스캐너는 개별 파일로 폴백)
+        logging.debug("파티션 기록 실패 %s: %s", code, e)
+
+
+# ==============================
+# 비동기 일괄 프리페치 (전체 다운로드 대상 종목)
+# ==============================
+YAHOO_CHART_URL = "https://query1.finance.yahoo.com/v8/finance/chart/{symbol}"
+PREFETCH_CONCURRENCY = 128  # 단일 이벤트 루프가 유지하는 동시 요청 수
+
+
+async def _prefetch_one(client, sem, code, history_years):
+    """야후 차트 API에서 한 종목의 일별 OHLCV를 받아 parquet으로 저장한다."""
+    async with sem:
+        try:
+            resp = await client.get(
+                YAHOO_CHART_URL.format(symbol=f"{code}.KS"),
+                params={"range": f"{history_years}y", "interval": "1d"},
+            )
+            resp.raise_for_status()
+            result = (resp.json().get("chart") or {}).get("result")
+            if not result:
+                return
+            ts = result[0].get("timestamp") or []
+            quote = (result[0].get("indicators") or {}).get("quote") or [{}]
+            if not ts:
+                return
+            df = pd.DataFrame({
+                "Date": pd.to_datetime(ts, unit="s").normalize(),
+                "Open": quote[0].get("open"),
+                "High": quote[0].get("high"),
+                "Low": quote[0].get("low"),
+                "Close": quote[0].get("close"),
+                "Volume": quote[0].get("volume"),
+            }).dropna(subset=["Close"])
+            if not df.empty:
+                write_parquet(df, DATA_DIR / f"{code}.parquet", code)
+        except Exception as e:
+            # 프리페치 실패 종목은 기존 스레드 경로(fdr)가 다시 시도
+            logging.debug("프리페치 실패 %s: %s", code, e)
+
+
+async def _prefetch_async(codes, history_years):
+    sem = asyncio.Semaphore(PREFETCH_CONCURRENCY)
+    limits = httpx.Limits(max_connections=PREFETCH_CONCURRENCY)
+    async with httpx.AsyncClient(timeout=10.0, limits=limits,
+                                 headers={"User-Agent": "Mozilla/5.0"}) as client:
+        await asyncio.gather(*(_prefetch_one(client, sem, c, history_years) for c in codes))
+
+
+def scan_existing_codes() -> set:
+    """
+    DATA_DIR를 scandir 한 번으로 훑어 캐시된 종목코드 집합을 만든다.
+    종목별 Path.exists() stat 시스템콜 2800회를 디렉터리 열람 1회로 대체.
+    """
+    codes = set()
+    try:
+        with os.scandir(DATA_DIR) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.endswith(".parquet"):
+                    codes.add(entry.name[:-len(".parquet")])
+    except FileNotFoundError:
+        pass
+    return codes
+
+
+def prefetch_full_downloads(items, history_years, force_download, existing_codes):
+    """
+    캐시가 없어 전체 다운로드가 필요한 종목을 단일 이벤트 루프로 선다운로드한다.
+    스레드 워커는 HTTP 왕복 하나에 통째로 블로킹되지만, 이벤트 루프는 수백 개의
+    요청을 동시에 유지하므로 콜드런의 네트워크 구간이 크게 단축된다.
+    프리페치된 종목은 이후 스레드 단계에서 캐시/증분 경로로 처리된다.
+    """
+    # --force는 스레드 단계가 어차피 전체를 다시 받으므로 이중 다운로드를 피한다
+    if not HTTPX_AVAILABLE or force_download:
+        return
+    codes = [it.get("Code") for it in items if it.get("Code") not in existing_codes]
+    if not codes:
+        return
+    logging.info(f"[LOG] 비동기 프리페치 시작: {len(codes)}종목")
+    try:
+        asyncio.run(_prefetch_async(codes, history_years))
+        logging.info("[LOG] 비동기 프리페치 완료")
+    except Exception as e:
+        logging.warning(f"[LOG] 비동기 프리페치 실패 (스레드 경로로 계속): {e}")
+
+
 # ==============================
 # 단일 종목 데이터 수집
 # ==============================
-def fetch_and_save_data(item: Dict[str, Any], history_years: int, force_download: bool):
+def read_last_date(path: Path):
+    """
+    parquet 푸터의 로우그룹 통계만으로 마지막 거래일을 얻는다.
+    데이터 페이지를 디코딩하지 않으므로 비용이 파일 크기와 무관하게 O(KB).
+    판단이 불가능하면 None (호출부가 전체 재다운로드로 처리).
+    """
+    try:
+        pf = pq.ParquetFile(path)
+        meta = pf.metadata
+        names = pf.schema_arrow.names
+        if "Date" not in names:
+            return None
+        stats = meta.row_group(meta.num_row_groups - 1).column(names.index("Date")).statistics
+        if stats is not None and stats.has_min_max:
+            return pd.Timestamp(stats.max).date()
+    except Exception:
+        return None
+    return None
+
+
+def _df_to_ipc_bytes(df: pd.DataFrame) -> bytes:
+    """프로세스 경계 전달용 Arrow IPC 직렬화 (DataFrame 피클보다 훨씬 저렴)."""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+@lru_cache(maxsize=1)
+def _listing_snapshot_is_today() -> bool:
+    """종목 목록 파일이 오늘 기록되었는지 확인한다.
+
+    목록 스냅샷의 OHLCV를 오늘자 시세로 신뢰할 수 있는지의 판정 기준:
+    오늘 새로 받은(또는 갱신된) 목록일 때만 갭 보충에 사용한다."""
+    try:
+        return datetime.fromtimestamp(LISTING_FILE.stat().st_mtime).date() == datetime.now().date()
+    except OSError:
+        return False
+
+
+def _snapshot_fill_window() -> bool:
+    """목록 스냅샷 갭 보충이 허용되는 시점인지 판정한다.
+
+    평일 장 마감(15:30) 이후에만 허용: 주말 실행 시 금요일 시세가 찍힌
+    가짜 토요일 봉이, 장 시작 전 실행 시 전일 종가가 찍힌 오늘 봉이
+    영구 저장소에 들어가는 것을 막는다. (평일 휴장일은 거래 달력 없이
+    식별할 수 없어 이 검사의 범위 밖이다)"""
+    now = datetime.now()
+    return now.weekday() < 5 and (now.hour, now.minute) >= (15, 30)
+
+
+def fetch_stock_data(item: Dict[str, Any], history_years: int, force_download: bool, has_cache: bool):
+    """
+    I/O 단계 (스레드 풀): 신선도 판정 + fdr 다운로드까지만 수행한다.
+    has_cache는 호출부가 scandir 1회로 만든 캐시 존재 여부 (종목별 stat 생략).
+    반환: (메시지, 결과타입, payload) — payload가 None이면 인코딩 단계 불필요.
+    payload는 encode_and_save로 넘어가는 (code, name, update_type, IPC bytes, 행수).
+    """
     code = item.get("Code")
     name = item.get("Name")
     path = DATA_DIR / f"{code}.parquet"
     end_date = datetime.now().date()
-    existing_df = pd.DataFrame()
     last_date = None
 
-    if path.exists() and not force_download:
-        try:
-            existing_df = pd.read_parquet(path)
-            if not existing_df.empty and 'Date' in existing_df.columns:
-                existing_df['Date'] = pd.to_datetime(existing_df['Date'])
-                last_date = existing_df['Date'].max().date()
-                if last_date >= end_date:
-                    return f"{code} {name} → 이미 최신", "cached"
-        except Exception as e:
-            # 파일 읽기 오류는 상세 로그를 남기지 않고, 재다운로드 유도 (last_date = None)
-            logging.warning(f"[{code}] {name} Parquet 파일 읽기 오류: {e}. 전체 재다운로드를 시도합니다.")
-            last_date = None
+    if has_cache and not force_download:
+        # 전체 파일을 읽지 않고 푸터 통계만으로 최신 여부 판정
+        # (기존에는 최신 스칼라 하나를 얻으려고 OHLCV 전체를 디코딩했음)
+        last_date = read_last_date(path)
+        if last_date is not None and last_date >= end_date:
+            return f"{code} {name} → 이미 최신", "cached", None
+        if last_date is None:
+            # 메타데이터 판독 불가 파일은 전체 재다운로드 유도
+            logging.warning(f"[{code}] {name} Parquet 메타데이터 확인 실패. 전체 재다운로드를 시도합니다.")
 
     if last_date and not force_download:
         start_date_str = (last_date + timedelta(days=1)).strftime('%Y-%m-%d')
@@ -164,38 +398,85 @@ def fetch_and_save_data(item: Dict[str, Any], history_years: int, force_download
         start_date_str = (datetime.now() - timedelta(days=history_years * 365)).strftime('%Y-%m-%d')
         update_type = "전체"
 
+    # 하루 뒤처진 종목은 KRX 목록 스냅샷(오늘의 OHLCV 포함)으로 현지에서 보충:
+    # 목록 한 번의 일괄 요청이 종목별 1일치 HTTP 왕복 수천 건을 대체한다
+    # 목록 항목에는 신뢰할 만한 날짜 필드가 없으므로 (fdr 목록에 Date 없음,
+    # JSON 캐시는 날짜를 epoch-ms로 저장) 목록 파일 자체의 신선도로 판정한다
+    # 평일 장 마감 이후에만 적용 — 주말/장전 실행에서 가짜 봉이 생기면
+    # read_last_date가 "이미 최신"으로 판정해 진짜 봉을 영영 받지 못한다
+    if (update_type == "증분" and (end_date - last_date).days == 1
+            and _snapshot_fill_window()
+            and _listing_snapshot_is_today()
+            and item.get("Close") not in (None, 0) and not pd.isna(item.get("Close"))):
+        df = pd.DataFrame([{
+            "Date": pd.Timestamp(end_date),
+            "Open": item.get("Open"),
+            "High": item.get("High"),
+            "Low": item.get("Low"),
+            "Close": item.get("Close"),
+            "Volume": item.get("Volume"),
+        }])
+        return f"{code} {name} → 수신 완료 (스냅샷)", update_type, \
+            (code, name, update_type, _df_to_ipc_bytes(df), 1)
+
     for attempt in range(MAX_RETRIES):
         try:
             # 타임아웃 처리를 위해 requests 라이브러리 레벨의 예외를 명시적으로 처리해야 함.
             df = fdr.DataReader(code, start=start_date_str, end=end_date.strftime('%Y-%m-%d'))
             if df.empty:
-                return f"{code} {name} → 데이터 없음", "no_data"
+                return f"{code} {name} → 데이터 없음", "no_data", None
             df = df.reset_index()
-            
-            if update_type == "증분" and not existing_df.empty:
-                existing_df['Date'] = pd.to_datetime(existing_df['Date'])
-                combined_df = pd.concat([existing_df, df], ignore_index=True).drop_duplicates(subset=['Date'], keep='last')
-                combined_df.sort_values(by='Date').to_parquet(path, index=False)
-                return f"{code} {name} → 저장 완료 (증분, {len(df)}행)", "success"
-            else:
-                df.to_parquet(path, index=False)
-                return f"{code} {name} → 저장 완료 ({update_type}, {len(df)}행)", "success"
-        
+            return f"{code} {name} → 수신 완료", update_type, \
+                (code, name, update_type, _df_to_ipc_bytes(df), len(df))
+
         except requests.exceptions.RequestException as e:
             # 네트워크/요청 오류 상세 로깅 (타임아웃 포함)
             logging.error(f"[{code}] {name} 네트워크 오류/타임아웃 발생 (시도 {attempt + 1}/{MAX_RETRIES}): {e}")
             if attempt < MAX_RETRIES - 1:
                 time.sleep(1 + attempt)
             else:
-                return f"{code} {name} → 최종 실패: {type(e).__name__}", "failed"
-        
+                return f"{code} {name} → 최종 실패: {type(e).__name__}", "failed", None
+
         except Exception as e:
             # 🔥 제시된 개선사항 반영: 상세 오류 로깅 (기타 예외) 🔥
             # exc_info=False로 설정하여 traceback은 남기지 않고 메시지만 상세히 기록
             logging.error(f"[{code}] {name} 데이터 수집 중 상세 예외 발생: {type(e).__name__} - {e}", exc_info=False)
-            return f"{code} {name} → 실패: {type(e).__name__}", "failed"
+            return f"{code} {name} → 실패: {type(e).__name__}", "failed", None
+
+    return f"{code} {name} → 최종 실패 (모든 재시도 소진)", "failed", None
+
+
+def encode_and_save(code: str, name: str, update_type: str, ipc_bytes: bytes, n_rows: int):
+    """
+    CPU 단계 (프로세스 풀): IPC bytes 복원 → 기존 데이터 병합 → parquet 기록.
+    pandas/pyarrow 인코딩이 GIL에 묶여 I/O 스레드를 직렬화하지 않도록 분리되었다.
+    """
+    try:
+        table = pa.ipc.open_stream(pa.BufferReader(ipc_bytes)).read_all()
+        path = DATA_DIR / f"{code}.parquet"
+
+        if update_type == "증분" and path.exists():
+            # 병합/중복 제거를 pandas 없이 Arrow 연산으로 수행:
+            # concat + 안정 정렬 뒤, 같은 날짜는 마지막(신규) 행만 남긴다
+            # memory_map: 파일을 익명 메모리로 통째 복사하지 않고 페이지 캐시에서 직접 디코딩
+            existing = pq.read_table(path, memory_map=True)
+            # 구 파일(ns 타임스탬프)과 신규 데이터의 Date 타입을 date32로 맞춘 뒤 병합
+            # _normalize_date가 양쪽 스키마를 동일하게 맞추므로 스키마 승격 옵션은 불필요
+            # (promote= 키워드는 pyarrow 14에서 deprecated, 이후 릴리스에서 제거됨)
+            combined = pa.concat_tables(
+                [_normalize_date(existing), _normalize_date(table)]
+            ).sort_by('Date')
+            dates = np.asarray(combined.column('Date'))
+            keep = np.append(dates[1:] != dates[:-1], True)
+            write_parquet(combined.filter(pa.array(keep)), path, code)
+            return f"{code} {name} → 저장 완료 (증분, {n_rows}행)", "success"
+
+        write_parquet(table, path, code)
+        return f"{code} {name} → 저장 완료 ({update_type}, {n_rows}행)", "success"
 
-    return f"{code} {name} → 최종 실패 (모든 재시도 소진)", "failed"
+    except Exception as e:
+        logging.error(f"[{code}] {name} 저장 중 예외 발생: {type(e).__name__} - {e}", exc_info=False)
+        return f"{code} {name} → 실패: {type(e).__name__}", "failed"
 
 # ==============================
 # 병렬 다운로드 처리
@@ -206,43 +487,82 @@ def download_and_save_stocks(krx, workers: int, history_years: int, force_downlo
     logging.info(f"[PROGRESS] 25.0 KRX 목록 {total_count}건 로드됨 (워커: {workers})")
     if force_download:
         logging.info("[LOG] --force 전체 다운로드 강제모드")
+
+    # 캐시 존재 여부는 scandir 1회로 일괄 수집 (종목별 exists() stat 제거)
+    existing_codes = scan_existing_codes()
+
+    # 전체 다운로드 대상은 스레드 분배 전에 비동기로 일괄 수집
+    prefetch_full_downloads(items, history_years, force_download, existing_codes)
+    if HTTPX_AVAILABLE and not force_download:
+        # 프리페치가 새 캐시 파일을 만들었을 수 있으므로 한 번 더 갱신
+        existing_codes = scan_existing_codes()
+
     logging.info("[PROGRESS] 30.0 개별 종목 다운로드 시작")
 
     update_step = max(1, total_count // 50)
     completed_count = success_count = failed_count = 0
 
-    with ThreadPoolExecutor(max_workers=workers) as executor:
-        futures = {executor.submit(fetch_and_save_data, item, history_years, force_download): item for item in items}
+    def _account(result_msg, result_type):
+        nonlocal completed_count, success_count, failed_count
+        if result_type == "failed":
+            failed_count += 1
+        elif result_type != "cached":
+            success_count += 1
+        completed_count += 1
+        # 지연 포맷(%): 문자열 구성은 리스너 스레드에서만 수행
+        logging.info("[LOG] %s (%d/%d)", result_msg, completed_count, total_count)
+        if (completed_count % update_step == 0) or (completed_count == total_count):
+            pct = 30.0 + (completed_count / total_count) * 70.0
+            logging.info("[PROGRESS] %.1f 종목 저장 %d/%d", pct, completed_count, total_count)
 
-        for future in as_completed(futures):
-            item = futures[future]
-            code = item.get("Code")
+    # fork-after-threads 문제를 피하기 위해 forkserver 우선, 미지원(Windows)이면 spawn
+    try:
+        mp_ctx = mp.get_context("forkserver")
+    except ValueError:
+        mp_ctx = mp.get_context("spawn")
+
+    # I/O 단계(네트워크)는 스레드, CPU 단계(병합+parquet 인코딩)는 프로세스로 분리:
+    # 인코딩이 GIL을 쥐고 다운로드 스레드를 직렬화하던 구간이 코어 수만큼 병렬화된다
+    with ThreadPoolExecutor(max_workers=workers) as io_pool, \
+         ProcessPoolExecutor(max_workers=os.cpu_count() or 1, mp_context=mp_ctx) as cpu_pool:
+        def _safe_fetch(item):
+            # 예외를 워커 안에서 실패 튜플로 변환: 결과가 종목 정보를 스스로 담으므로
+            # Future→item 딕셔너리(2800개 Future 키 해싱/보관)가 필요 없다
+            try:
+                return fetch_stock_data(item, history_years, force_download,
+                                        item.get("Code") in existing_codes)
+            except Exception as e:
+                code = item.get("Code")
+                logging.critical(f"[CRITICAL_ERROR] {code} 치명적 예외 발생: {e}")
+                return f"{code} → 실패: {type(e).__name__}", "failed", None
+
+        fetch_futures = [io_pool.submit(_safe_fetch, item) for item in items]
+        encode_futures = []
+
+        for future in as_completed(fetch_futures):
             try:
                 # 개별 스레드 실행 결과에 대한 타임아웃 처리
-                result_msg, result_type = future.result(timeout=PER_STOCK_TIMEOUT + 5) # 스레드 실행 자체에 대한 추가 타임아웃
-                
-                if result_type == "failed":
-                    failed_count += 1
-                elif result_type != "cached":
-                    success_count += 1
-                    
-                completed_count += 1
-                logging.info(f"[LOG] {result_msg} ({completed_count}/{total_count})")
-                
-                if (completed_count % update_step == 0) or (completed_count == total_count):
-                    pct = 30.0 + (completed_count / total_count) * 70.0
-                    logging.info(f"[PROGRESS] {pct:.1f} 종목 저장 {completed_count}/{total_count}")
-                    
+                result_msg, result_type, payload = future.result(timeout=PER_STOCK_TIMEOUT + 5)
+                if payload is not None:
+                    # 집계/로그는 인코딩이 실제로 끝난 시점에 수행
+                    encode_futures.append(cpu_pool.submit(encode_and_save, *payload))
+                else:
+                    _account(result_msg, result_type)
+
             except TimeoutError:
                 failed_count += 1
                 completed_count += 1
                 # TimeoutError는 ThreadPoolExecutor에서 발생하므로 여기서 로그 기록
-                logging.error(f"[TIMEOUT] {code} → 응답 없음 (작업 실행 {PER_STOCK_TIMEOUT + 5}초 초과)")
+                logging.error(f"[TIMEOUT] 응답 없음 (작업 실행 {PER_STOCK_TIMEOUT + 5}초 초과)")
+
+        for future in as_completed(encode_futures):
+            try:
+                result_msg, result_type = future.result()
+                _account(result_msg, result_type)
             except Exception as e:
                 failed_count += 1
                 completed_count += 1
-                # 스레드 실행 중 발생한 기타 치명적 오류 로깅
-                logging.critical(f"[CRITICAL_ERROR] {code} 치명적 예외 발생: {e}")
+                logging.critical(f"[CRITICAL_ERROR] 저장 단계 치명적 예외 발생: {e}")
 
     progress = 30.0 + (completed_count / total_count) * 70.0 if total_count > 0 else 0.0
     return completed_count, success_count, failed_count, total_count, progress
@@ -250,20 +570,17 @@ def download_and_save_stocks(krx, workers: int, history_years: int, force_downlo
 # ==============================
 # 메인 실행
 # ==============================
-def main():
-    parser = argparse.ArgumentParser(description="주식 시세 데이터 업데이트 (v2.6)")
-    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
-    parser.add_argument("--history_years", type=int, default=DEFAULT_HISTORY_YEARS)
-    parser.add_argument("--force", action="store_true")
-    args = parser.parse_args()
-
+def run_update(workers: int, history_years: int, force: bool) -> dict:
+    """업데이트 1회 실행 후 결과 stats 딕셔너리 반환 (단발/데몬 공용 본체)"""
     start_time = time.time()
     stats = {"status": "failed", "success": 0, "failed": 0, "total": 0, "progress": 0.0}
     check_network_connection()
 
     try:
         krx_listing = load_krx_listing()
-        completed, success, failed, total, progress = download_and_save_stocks(krx_listing, args.workers, args.history_years, args.force)
+        # 데몬 모드에서 실행 간 날짜가 바뀔 수 있으므로 신선도 판정은 실행마다 갱신
+        _listing_snapshot_is_today.cache_clear()
+        completed, success, failed, total, progress = download_and_save_stocks(krx_listing, workers, history_years, force)
         stats.update({"success": success, "failed": failed, "total": total, "progress": round(progress, 1)})
 
         # ✅ 일부 실패는 정상 종료 (completed == total을 기준으로 최종 status 결정)
@@ -271,7 +588,7 @@ def main():
             stats["status"] = "completed"
         else:
             # 하나라도 미완료시 failed로 처리 (Timeout 포함)
-            stats["status"] = "failed" 
+            stats["status"] = "failed"
 
     except Exception as e:
         logging.critical(f"[ERROR] 실행 중 오류: {e}", exc_info=True)
@@ -285,10 +602,84 @@ def main():
             stats["progress"] = 100.0
         logging.info(f"[PROGRESS] {stats['progress']:.1f} 최종 진행률 반영")
 
-        print(json.dumps(stats, ensure_ascii=False), flush=True)
+    return stats
+
+
+# ==============================
+# 데몬 모드 (선택 실행)
+# ==============================
+DAEMON_SOCKET = Path(os.environ.get("KRX_UPDATER_SOCK", "/tmp/krx_updater.sock"))
+
+
+def run_daemon():
+    """
+    UNIX 소켓으로 JSON 명령을 받아 같은 프로세스에서 업데이트를 반복 실행.
+    인터프리터 기동 + pandas/pyarrow 임포트 비용을 첫 1회로 한정한다.
+
+    명령 예: {"force": true, "workers": 16}  /  {"op": "shutdown"}
+    AF_UNIX 미지원 플랫폼(Windows 등)에서는 단발 실행만 가능.
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        logging.error("[ERROR] 이 플랫폼은 AF_UNIX 미지원 → 데몬 모드 불가 (단발 실행 사용)")
+        sys.exit(1)
+
+    if DAEMON_SOCKET.exists():
+        DAEMON_SOCKET.unlink()
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(str(DAEMON_SOCKET))
+    server.listen(1)
+    logging.info(f"[LOG] 데몬 대기 시작: {DAEMON_SOCKET}")
+
+    try:
+        while True:
+            conn, _ = server.accept()
+            with conn:
+                try:
+                    raw = conn.recv(65536)
+                    if not raw:
+                        continue
+                    cmd = json.loads(raw.decode("utf-8"))
+                    if cmd.get("op") == "shutdown":
+                        conn.sendall(b'{"status": "shutdown"}\n')
+                        break
+                    stats = run_update(
+                        workers=int(cmd.get("workers", DEFAULT_WORKERS)),
+                        history_years=int(cmd.get("history_years", DEFAULT_HISTORY_YEARS)),
+                        force=bool(cmd.get("force", False)),
+                    )
+                    conn.sendall((json.dumps(stats, ensure_ascii=False) + "\n").encode("utf-8"))
+                except Exception as e:
+                    logging.error(f"[ERROR] 데몬 명령 처리 실패: {e}")
+                    try:
+                        conn.sendall(json.dumps({"status": "failed", "error": str(e)}).encode("utf-8"))
+                    except OSError:
+                        pass
+    finally:
+        server.close()
+        DAEMON_SOCKET.unlink(missing_ok=True)
+        logging.info("[LOG] 데몬 종료")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="주식 시세 데이터 업데이트 (v2.6)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--history_years", type=int, default=DEFAULT_HISTORY_YEARS)
+    parser.add_argument("--force", action="store_true")
+    parser.add_argument("--daemon", action="store_true", help="소켓 명령 대기 모드 (임포트 비용 재사용)")
+    args = parser.parse_args()
+
+    if args.daemon:
+        run_daemon()
         logging.shutdown()
+        return
+
+    stats = run_update(args.workers, args.history_years, args.force)
+
+    print(json.dumps(stats, ensure_ascii=False), flush=True)
+    logging.shutdown()
 
-        sys.exit(0 if stats["status"] == "completed" else 1)
+    sys.exit(0 if stats["status"] == "completed" else 1)
 
 
 if __name__ == "__main__":